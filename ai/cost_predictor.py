@@ -8,10 +8,15 @@ Uses simple ML models to avoid expensive cloud ML services
 import json
 import sys
 from datetime import datetime, timedelta
+from pathlib import Path
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import logging
 
+# Shared client pool lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aws_client import get_client
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -109,12 +114,11 @@ class CostPredictor:
     
     def analyze_cleanup_opportunities(self):
         """Multi-region cleanup analysis"""
-        import boto3
         from concurrent.futures import ThreadPoolExecutor
         
         def check_region(region):
             try:
-                ec2 = boto3.client('ec2', region_name=region)
+                ec2 = get_client('ec2', region=region)
                 
                 # Unused volumes
                 volumes = ec2.describe_volumes(Filters=[{'Name': 'status', 'Values': ['available']}])
@@ -8,51 +8,40 @@ Replaces 91 shell scripts with one Python application
 import os
 import sys
 import json
-import subprocess
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 import logging
 
+from aws_client import aws_call, current_account
+from cloud_providers import collect_costs, default_providers
+from http_cache import json_response
+from live_updates import HubFullError, UpdateHub
+from metrics import get_registry, instrument_app
+from response_cache import consume_refresh_flag, get_cache
+from snapshot import SnapshotRefresher
+
 # Setup
 app = Flask(__name__)
+instrument_app(app, 'dashboard')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class CloudManager:
-    def __init__(self):
+    def __init__(self, providers=None):
         self.base_path = Path(__file__).parent
-        
-    def get_aws_costs(self):
-        """Get AWS costs using local processing"""
-        try:
-            result = subprocess.run(['aws', 'ce', 'get-cost-and-usage', 
-                                   '--time-period', f'Start={self._get_date(-30)},End={self._get_date(0)}',
-                                   '--granularity', 'MONTHLY', '--metrics', 'BlendedCost'],
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                return float(data.get('ResultsByTime', [{}])[0].get('Total', {}).get('BlendedCost', {}).get('Amount', '0'))
-        except:
-            pass
-        return 150.0  # Fallback
-    
-    def get_azure_costs(self):
-        """Simulate Azure costs - would use Azure CLI"""
-        return 120.0
-    
-    def get_gcp_costs(self):
-        """Simulate GCP costs - would use gcloud"""
-        return 100.0
+        self.providers = providers or default_providers()
     
     def balance_workloads(self):
-        """Local cloud balancing logic"""
-        aws_cost = self.get_aws_costs()
-        azure_cost = self.get_azure_costs()
-        gcp_cost = self.get_gcp_costs()
+        """Local cloud balancing logic over costs collected from all providers at once"""
+        collected = collect_costs(self.providers)
+        costs = collected['costs']
+        if not costs:
+            return {'current_costs': {}, 'cheapest_provider': None, 'recommendations': [],
+                    'total_potential_savings': 0, 'degraded': True, 'providers': collected['providers']}
         
         # Find cheapest provider
-        costs = {'aws': aws_cost, 'azure': azure_cost, 'gcp': gcp_cost}
         cheapest = min(costs, key=costs.get)
+        aws_cost = costs.get('aws', 0)
         
         recommendations = []
         if cheapest != 'aws' and aws_cost > costs[cheapest] * 1.2:
@@ -67,7 +56,9 @@ class CloudManager:
             'current_costs': costs,
             'cheapest_provider': cheapest,
             'recommendations': recommendations,
-            'total_potential_savings': sum(max(0, costs['aws'] - costs[p]) for p in ['azure', 'gcp'])
+            'total_potential_savings': sum(max(0, aws_cost - cost) for p, cost in costs.items() if p != 'aws'),
+            'degraded': collected['degraded'],
+            'providers': collected['providers']
         }
     
     def security_scan(self):
@@ -75,12 +66,9 @@ class CloudManager:
         issues = []
         try:
             # Check for root keys
-            result = subprocess.run(['aws', 'iam', 'get-account-summary'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                if data.get('SummaryMap', {}).get('AccountAccessKeysPresent', 0) > 0:
-                    issues.append({'severity': 'HIGH', 'issue': 'Root access keys detected'})
+            data = aws_call('iam', 'get-account-summary')
+            if data.get('SummaryMap', {}).get('AccountAccessKeysPresent', 0) > 0:
+                issues.append({'severity': 'HIGH', 'issue': 'Root access keys detected'})
         except:
             pass
         
@@ -97,29 +85,93 @@ class CloudManager:
 # Initialize manager
 cloud_manager = CloudManager()
 
+# Dashboard results are recomputed in the background and served from the last snapshot
+snapshots = SnapshotRefresher(store=get_cache(), account=current_account)
+snapshots.register('balance', cloud_manager.balance_workloads)
+snapshots.register('security', cloud_manager.security_scan)
+
+# Connected dashboards get each snapshot change once, as a delta, instead of polling
+updates = UpdateHub()
+snapshots.subscribe(updates.publish)
+
+get_registry().gauge('snapshot_age_seconds', 'Age of the served snapshot', ('name',),
+                     function=lambda: {(name,): meta['age_seconds']
+                                       for name, meta in snapshots.status().items() if meta['age_seconds'] is not None})
+get_registry().gauge('live_update_subscribers', 'Dashboards connected to /api/stream',
+                     function=lambda: updates.stats()['subscribers'])
+
 # Web Routes
 @app.route('/')
 def dashboard():
     return render_template('dashboard.html')
 
+def _snapshot_response(snapshot, body=None):
+    """JSON body of a snapshot with its age attached (body field and Age header)
+
+    GETs are conditional on the snapshot's content hash and cacheable
+    until the snapshot goes stale.
+    """
+    meta = snapshot.meta(snapshots.interval)
+    if not snapshot.ready:
+        response = jsonify({'status': 'pending', 'snapshot': meta})
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 503
+    payload = dict(body if body is not None else snapshot.value)
+    payload['snapshot'] = meta
+    headers = {'Age': str(int(meta['age_seconds']))}
+    if request.method != 'GET':
+        response = jsonify(payload)
+        response.headers.update(headers)
+        return response
+    return json_response(payload, etag=snapshot.etag, max_age=snapshot.max_age(snapshots.interval),
+                         headers=headers)
+
+def _get_snapshot(name):
+    """Last good snapshot; ?refresh=1 recomputes now, bypassing cached AWS responses"""
+    if request.args.get('refresh') == '1':
+        return snapshots.refresh(name, bypass_cache=True)
+    return snapshots.get(name)
+
 @app.route('/api/costs')
 def api_costs():
-    return jsonify(cloud_manager.balance_workloads())
+    return _snapshot_response(_get_snapshot('balance'))
 
 @app.route('/api/security')
 def api_security():
-    return jsonify(cloud_manager.security_scan())
+    return _snapshot_response(_get_snapshot('security'))
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-sent `snapshot` and `delta` events for the balance and security panels
+
+    Streams end after a few minutes and the browser reconnects; when this
+    worker has no stream slot left the dashboard falls back to polling.
+    """
+    snapshots.start()
+    try:
+        frames = updates.stream(request.headers.get('Last-Event-ID'))
+    except HubFullError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    return Response(frames, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/balance', methods=['POST'])
 def api_balance():
     """Trigger workload balancing"""
-    result = cloud_manager.balance_workloads()
-    return jsonify({'status': 'completed', 'result': result})
+    snapshot = snapshots.refresh('balance', bypass_cache=request.args.get('refresh') == '1')
+    if snapshot.ready and snapshot.failed:
+        # The last good result is still attached, but this run did not produce it
+        return _snapshot_response(snapshot, {'status': 'failed', 'error': snapshot.error,
+                                             'result': snapshot.value}), 502
+    return _snapshot_response(snapshot, {'status': 'completed', 'result': snapshot.value})
 
 # CLI Interface
 def cli_main():
+    consume_refresh_flag(sys.argv)
     if len(sys.argv) < 2:
-        print("Usage: python3 app.py {costs|security|balance|web}")
+        print("Usage: python3 app.py {costs|security|balance|web|serve} [--refresh]")
         return
     
     command = sys.argv[1]
@@ -133,14 +185,19 @@ def cli_main():
     elif command == 'balance':
         result = cloud_manager.balance_workloads()
         print(f"💰 Cost Analysis:")
-        print(f"AWS: ${result['current_costs']['aws']:.2f}")
-        print(f"Azure: ${result['current_costs']['azure']:.2f}")
-        print(f"GCP: ${result['current_costs']['gcp']:.2f}")
-        print(f"Cheapest: {result['cheapest_provider'].upper()}")
+        for provider, status in result['providers'].items():
+            cost = result['current_costs'].get(provider)
+            note = '' if status['status'] == 'ok' else f" ({status['status']}: {status['error']})"
+            print(f"{provider.upper()}: " + (f"${cost:.2f}" if cost is not None else "n/a") + note)
+        print(f"Cheapest: {(result['cheapest_provider'] or 'unknown').upper()}")
         print(f"Potential savings: ${result['total_potential_savings']:.2f}/month")
     elif command == 'web':
         print("🌐 Starting web dashboard on http://localhost:5000")
         app.run(host='0.0.0.0', port=5000, debug=False)
+    elif command == 'serve':
+        from wsgi_server import serve
+        print("🌐 Starting production dashboard server (gunicorn)")
+        serve('app:app')
     else:
         print(f"Unknown command: {command}")
 
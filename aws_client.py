@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+"""
+In-Process AWS Client Layer
+Runs AWS API calls through boto3 instead of forking the `aws` CLI per call
+"""
+
+import os
+import threading
+import time
+
+from metrics import instrument_client
+from rate_limiter import get_limiter
+from response_cache import get_cache, is_cacheable
+
+DEFAULT_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MGMT_MAX_POOL_CONNECTIONS', '50'))
+DEFAULT_TIMEOUT = int(os.environ.get('AWS_MGMT_TIMEOUT', '10'))
+
+
+class AWSClientError(Exception):
+    """Raised when an AWS call fails or boto3 is not available"""
+
+
+class ClientPool:
+    """Process-wide, thread-safe cache of boto3 sessions and clients
+
+    Building a client loads the botocore service model, so each
+    (profile, region, service) client is created once and shared by every
+    caller and thread. Each client keeps its own urllib3 connection pool of
+    `max_pool_connections` keep-alive connections. Every client is hooked
+    into the adaptive rate limiter and the call latency metrics.
+    """
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                 timeout=DEFAULT_TIMEOUT, keepalive=True, rate_limiter=None):
+        self.max_pool_connections = max_pool_connections
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.rate_limiter = rate_limiter or get_limiter()
+        self._sessions = {}
+        self._clients = {}
+        self._lock = threading.RLock()
+
+    def configure(self, max_pool_connections=None, timeout=None, keepalive=None):
+        """Change client settings; already-built clients are dropped"""
+        with self._lock:
+            if max_pool_connections is not None:
+                self.max_pool_connections = max_pool_connections
+            if timeout is not None:
+                self.timeout = timeout
+            if keepalive is not None:
+                self.keepalive = keepalive
+            self._clients.clear()
+
+    def session(self, profile=None):
+        """Get the shared boto3 session for a profile (boto3 stays an optional import)"""
+        with self._lock:
+            if profile not in self._sessions:
+                try:
+                    import boto3
+                except ImportError as e:
+                    raise AWSClientError("boto3 is not installed: pip install boto3") from e
+                self._sessions[profile] = boto3.Session(profile_name=profile)
+            return self._sessions[profile]
+
+    def client(self, service, region=None, profile=None):
+        """Get the shared client for (profile, region, service)"""
+        key = (profile, region, service)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        # botocore sessions are not thread-safe while building clients
+        with self._lock:
+            if key not in self._clients:
+                from botocore.config import Config
+                config = Config(connect_timeout=self.timeout, read_timeout=self.timeout,
+                                max_pool_connections=self.max_pool_connections,
+                                tcp_keepalive=self.keepalive,
+                                retries={'mode': 'standard'})
+                client = self.session(profile).client(service, region_name=region, config=config)
+                self._clients[key] = instrument_client(self.rate_limiter.install(client))
+            return self._clients[key]
+
+    def clear(self):
+        """Drop all cached sessions and clients"""
+        with self._lock:
+            self._clients.clear()
+            self._sessions.clear()
+
+
+_pool = ClientPool()
+
+
+def get_pool():
+    """The process-wide ClientPool"""
+    return _pool
+
+
+def get_client(service, region=None, profile=None):
+    """Shortcut for get_pool().client(...)"""
+    return _pool.client(service, region=region, profile=profile)
+
+
+# Access key -> account ID, shared by every AWSClient of the process
+_accounts = {}
+_accounts_lock = threading.Lock()
+
+
+class AWSClient:
+    def __init__(self, profile=None, region=None, pool=None):
+        self.profile = profile
+        self.region = region
+        self.pool = pool or get_pool()
+        self._account_id = None
+
+    def session(self):
+        """The pooled boto3 session for this client's profile"""
+        return self.pool.session(self.profile)
+
+    def client(self, service, region=None):
+        """The pooled boto3 client for service/region"""
+        return self.pool.client(service, region=region or self.region, profile=self.profile)
+
+    def account_id(self):
+        """Account of the current credentials (resolved once per process and access key)
+
+        Never taken from the response cache: a profile name says nothing
+        about which account its credentials belong to today.
+        """
+        if self._account_id is None:
+            credentials = self.session().get_credentials()
+            access_key = credentials.access_key if credentials else None
+            with _accounts_lock:
+                account = _accounts.get(access_key)
+            if account is None:
+                account = self._fetch('sts', 'get_caller_identity', None, False, {})['Account']
+                if access_key:
+                    with _accounts_lock:
+                        _accounts[access_key] = account
+            self._account_id = account
+        return self._account_id
+
+    def call(self, service, operation, region=None, query=None, paginate=True, cache=True, **params):
+        """Run `aws <service> <operation>` in-process
+
+        `operation` accepts the CLI spelling (describe-instances) or the boto3
+        one (describe_instances); `params` use boto3 names. As with the CLI,
+        paginated operations are fully aggregated before `query` (a JMESPath
+        expression, same as `--query`) is applied locally. Read-only calls
+        are served from the persistent response cache unless `cache=False`
+        or --refresh is in effect.
+        """
+        method = operation.replace('-', '_')
+        operation_key = f"{service}:{method}"
+        store = get_cache() if cache and is_cacheable(operation_key) else None
+
+        response = None
+        if store:
+            region_name = region or self.region or self.session().region_name
+            key = store.make_key(self.account_id(), region_name, operation_key, params)
+            response = store.get(key)
+        if response is None:
+            response = self._fetch(service, method, region, paginate, params)
+            if store:
+                store.set(key, operation_key, response)
+
+        if query:
+            import jmespath
+            return jmespath.search(query, response)
+        return response
+
+    def _fetch(self, service, method, region, paginate, params):
+        try:
+            client = self.client(service, region)
+            if paginate and client.can_paginate(method):
+                response = client.get_paginator(method).paginate(**params).build_full_result()
+            else:
+                response = getattr(client, method)(**params)
+        except AWSClientError:
+            raise
+        except Exception as e:
+            raise AWSClientError(f"{service} {method} failed: {e}") from e
+        response.pop('ResponseMetadata', None)
+        return response
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client():
+    """Process-wide AWSClient shared by all tools"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = AWSClient()
+        return _default_client
+
+
+# After a failed lookup, current_account() answers None for this long before asking STS again
+ACCOUNT_RETRY = int(os.environ.get('AWS_MGMT_ACCOUNT_RETRY', '60'))
+_account_failed_at = None
+
+
+def current_account():
+    """Account of the default credentials, or None when there are none (keys shared stores)
+
+    Success is kept for the process (by the default client); a failure is
+    kept for ACCOUNT_RETRY seconds, so building store keys never walks the
+    credential chain or retries STS on every request.
+    """
+    global _account_failed_at
+    if _account_failed_at is not None and time.monotonic() - _account_failed_at < ACCOUNT_RETRY:
+        return None
+    try:
+        account = get_default_client().account_id()
+    except Exception:
+        # Missing boto3, unknown profile or no credentials
+        _account_failed_at = time.monotonic()
+        return None
+    _account_failed_at = None
+    return account
+
+
+def aws_call(service, operation, region=None, query=None, **params):
+    """Shortcut for get_default_client().call(...)"""
+    return get_default_client().call(service, operation, region=region, query=query, **params)
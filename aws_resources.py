@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+Streaming AWS Resource Iterators
+Generator-based pagination so large accounts are walked page by page in flat memory
+"""
+
+from aws_client import AWSClientError, get_client
+
+
+def iter_pages(service, operation, region=None, profile=None, page_size=None, **params):
+    """Yield raw response pages of a paginated operation as they arrive"""
+    try:
+        client = get_client(service, region=region, profile=profile)
+        method = operation.replace('-', '_')
+        if not client.can_paginate(method):
+            # Older botocore releases ship no paginator for some list calls
+            yield getattr(client, method)(**params)
+            return
+        config = {'PageSize': page_size} if page_size else {}
+        for page in client.get_paginator(method).paginate(PaginationConfig=config, **params):
+            yield page
+    except AWSClientError:
+        raise
+    except Exception as e:
+        raise AWSClientError(f"{service} {operation} failed: {e}") from e
+
+
+def iter_items(service, operation, key, region=None, profile=None, page_size=None, **params):
+    """Yield the items under `key` of every page, one at a time"""
+    for page in iter_pages(service, operation, region=region, profile=profile,
+                           page_size=page_size, **params):
+        yield from page.get(key, [])
+
+
+def iter_ec2_instances(region=None, profile=None, states=None, **params):
+    """Yield EC2 instances (reservations flattened), optionally filtered by state"""
+    if states:
+        params['Filters'] = params.get('Filters', []) + [{'Name': 'instance-state-name', 'Values': list(states)}]
+    for reservation in iter_items('ec2', 'describe_instances', 'Reservations',
+                                  region=region, profile=profile, page_size=1000, **params):
+        yield from reservation.get('Instances', [])
+
+
+def iter_ebs_volumes(region=None, profile=None, status=None, **params):
+    """Yield EBS volumes, optionally filtered by status (e.g. 'available')"""
+    if status:
+        params['Filters'] = params.get('Filters', []) + [{'Name': 'status', 'Values': [status]}]
+    yield from iter_items('ec2', 'describe_volumes', 'Volumes',
+                          region=region, profile=profile, page_size=500, **params)
+
+
+def iter_ebs_snapshots(region=None, profile=None, **params):
+    """Yield EBS snapshots owned by the account"""
+    params.setdefault('OwnerIds', ['self'])
+    yield from iter_items('ec2', 'describe_snapshots', 'Snapshots',
+                          region=region, profile=profile, page_size=1000, **params)
+
+
+def iter_s3_buckets(profile=None):
+    """Yield S3 buckets"""
+    yield from iter_items('s3', 'list_buckets', 'Buckets', profile=profile)
+
+
+def bucket_region(bucket, profile=None):
+    """Region of an S3 bucket, given a bucket dict from iter_s3_buckets or a name"""
+    if isinstance(bucket, dict):
+        if bucket.get('BucketRegion'):
+            return bucket['BucketRegion']
+        bucket = bucket['Name']
+    try:
+        location = get_client('s3', profile=profile).get_bucket_location(Bucket=bucket)
+    except Exception as e:
+        raise AWSClientError(f"s3 get_bucket_location failed for {bucket}: {e}") from e
+    constraint = location.get('LocationConstraint')
+    # Legacy constraints: none means us-east-1, 'EU' means eu-west-1
+    return {None: 'us-east-1', '': 'us-east-1', 'EU': 'eu-west-1'}.get(constraint, constraint)
+
+
+def iter_s3_objects(bucket, prefix='', region=None, profile=None):
+    """Yield the objects of a bucket, 1000 keys per request"""
+    yield from iter_items('s3', 'list_objects_v2', 'Contents', region=region, profile=profile,
+                          Bucket=bucket, Prefix=prefix)
+
+
+def iter_lambda_functions(region=None, profile=None):
+    """Yield Lambda functions"""
+    yield from iter_items('lambda', 'list_functions', 'Functions', region=region, profile=profile)
+
+
+def iter_iam_users(profile=None):
+    """Yield IAM users"""
+    yield from iter_items('iam', 'list_users', 'Users', profile=profile)
+
+
+def iter_iam_roles(profile=None):
+    """Yield IAM roles"""
+    yield from iter_items('iam', 'list_roles', 'Roles', profile=profile)
+
+
+def iter_iam_policies(scope='Local', profile=None):
+    """Yield IAM managed policies for a scope (Local, AWS or All)"""
+    yield from iter_items('iam', 'list_policies', 'Policies', profile=profile, Scope=scope)
+
+
+def iter_access_keys(user_name, profile=None):
+    """Yield access key metadata for an IAM user"""
+    yield from iter_items('iam', 'list_access_keys', 'AccessKeyMetadata', profile=profile,
+                          UserName=user_name)
+
+
+def count(iterable):
+    """Count items of an iterator without materializing it"""
+    return sum(1 for _ in iterable)
@@ -4,42 +4,120 @@
 # @brief REST API server for AWS Management Scripts
 # @description Flask-based API to expose shell script functionality
 
-from flask import Flask, jsonify, request
-import subprocess
+from flask import Flask, Response, jsonify, request
+from contextlib import nullcontext
 import json
 import os
+import sys
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from http_cache import content_hash, json_response
+from inventory import KINDS as INVENTORY_KINDS, InvalidCursorError
+from metrics import get_registry, instrument_app
+from aws_client import current_account
+from response_cache import get_cache, refreshing
+from services.aws_service import AWSService
+from services.batch import BatchRunner, UnknownOperationError
+from services.job_queue import JobQueue, QueueFullError
+from services.script_executor import ScriptExecutor, SlotBusyError
+from services.script_stream import sse
 
 app = Flask(__name__)
+instrument_app(app, 'api')
+
+SCRIPT_DIR = os.environ.get('AWS_MGMT_SCRIPT_DIR', '..')
+# Longest a script may run; jobs no longer hold a request, so the limit is generous
+SCRIPT_TIMEOUT = int(os.environ.get('AWS_MGMT_SCRIPT_TIMEOUT', '3600'))
+# How long the synchronous endpoints wait before answering with a job to poll
+SYNC_WAIT = float(os.environ.get('AWS_MGMT_SYNC_WAIT', '30'))
+
+# Only scripts exposed by an endpoint may be queued as jobs
+SCRIPTS = {'aws_manager.sh', 'billing.sh', 'cloudfront_audit.sh', 'aws_mfa.sh', 'integration_runner.sh'}
+# Scripts taking or returning secrets (MFA tokens, credentials): never streamed over GET or shared on disk
+SECRET_SCRIPTS = {'aws_mfa.sh'}
+STREAMABLE = SCRIPTS - SECRET_SCRIPTS
+
+# Job records and read-only script results are shared by all server workers
+jobs = JobQueue(store=get_cache(), account=current_account)
+executor = ScriptExecutor(SCRIPT_DIR, SCRIPT_TIMEOUT, store=get_cache(), account=current_account)
+get_registry().gauge('jobs', 'Jobs held by this worker by status', ('status',),
+                     function=lambda: {(status,): count for status, count in jobs.stats().items()})
+
+# @function forecast
+# @brief 30-day demand forecast from EC2 usage
+def forecast():
+    from forecast_allocator import ForecastAllocator
+    return ForecastAllocator().forecast_demand()
+
+# One AWSService, so batch operations share its session and clients
+aws_service = AWSService()
+batch = BatchRunner({
+    'costs': aws_service.get_cost_data,
+    'resources': aws_service.get_resources_summary,
+    'security': aws_service.get_security_findings,
+    'forecast': forecast,
+    'billing': lambda: run_script('billing.sh'),
+    'audit': lambda: run_script('cloudfront_audit.sh')
+}, timeout=SYNC_WAIT)
 
 # @function run_script
-# @brief Execute shell script and return JSON response
-def run_script(script_name, args=[]):
+# @brief Execute shell script and return JSON response (shared with identical runs in flight)
+def run_script(script_name, args=[], fresh=False):
+    return executor.run(script_name, args, fresh=fresh)
+
+# @function submit_script
+# @brief Queue a script run on the job pool
+def submit_script(script_name, args=[], fresh=False):
+    return jobs.submit(script_name, {"args": args}, lambda job: run_script(script_name, args, fresh),
+                       persist=script_name not in SECRET_SCRIPTS)
+
+# @function script_response
+# @brief Run a script as a job; reply with its result, or with the job to poll if it is still running
+def script_response(script_name, args=[]):
     try:
-        cmd = [f"../{script_name}"] + args
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout,
-            "error": result.stderr,
-            "exit_code": result.returncode
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+        job = submit_script(script_name, args, fresh=request.args.get('refresh') == '1')
+    except QueueFullError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    if job.wait(SYNC_WAIT) and job.status == 'completed':
+        return result_response(script_name, job.result)
+    if job.status == 'failed':
+        return jsonify({"success": False, "error": job.error})
+    return jsonify(job_status(job)), 202
+
+# @function result_response
+# @brief Script result with an ETag over its output, cacheable for as long as the result may be reused
+def result_response(script_name, result):
+    if request.method != 'GET':
+        return jsonify(result)
+    # The timestamp changes on every run; identical output keeps the same tag
+    etag = content_hash({k: v for k, v in result.items() if k != 'finished_at'})
+    return json_response(result, etag=etag, max_age=executor.max_age(script_name, result))
+
+def job_status(job, detail=True):
+    status = job.to_dict()
+    if not detail:
+        # Listings never echo arguments (MFA tokens) or outputs (credentials)
+        del status["params"], status["result"]
+    status["links"] = {"self": f"/api/jobs/{job.id}"}
+    return status
 
 @app.route('/api/resources', methods=['GET'])
 def get_resources():
     """Get AWS resource overview"""
-    return jsonify(run_script("aws_manager.sh"))
+    return script_response("aws_manager.sh")
 
 @app.route('/api/billing', methods=['GET'])
 def get_billing():
     """Get billing information"""
-    return jsonify(run_script("billing.sh"))
+    return script_response("billing.sh")
 
 @app.route('/api/audit/cloudfront', methods=['GET'])
 def audit_cloudfront():
     """Run CloudFront security audit"""
-    return jsonify(run_script("cloudfront_audit.sh"))
+    return script_response("cloudfront_audit.sh")
 
 @app.route('/api/mfa', methods=['POST'])
 def generate_mfa():
@@ -47,12 +125,119 @@ def generate_mfa():
     data = request.json
     token = data.get('token')
     profile = data.get('profile', 'default')
-    return jsonify(run_script("aws_mfa.sh", [token, profile]))
+    return script_response("aws_mfa.sh", [token, profile])
 
 @app.route('/api/integrations', methods=['GET'])
 def run_integrations():
     """Run all integrations"""
-    return jsonify(run_script("integration_runner.sh"))
+    return script_response("integration_runner.sh")
+
+@app.route('/api/inventory/<kind>', methods=['GET'])
+def get_inventory(kind):
+    """Page through resources: ?limit=&cursor=&region=&state=&tag=Key=Value&fields=id,state,InstanceType
+
+    ?refresh=1 re-lists every region (bypassing cached AWS responses) before answering.
+    """
+    if kind not in INVENTORY_KINDS:
+        return jsonify({"success": False, "error": f"Unknown resource kind: {kind}",
+                        "kinds": sorted(INVENTORY_KINDS)}), 400
+    tags = dict(tag.partition('=')[::2] for tag in request.args.getlist('tag'))
+    fields = [field for field in request.args.get('fields', '').split(',') if field] or None
+    try:
+        with refreshing() if request.args.get('refresh') == '1' else nullcontext():
+            page = aws_service.get_inventory(kind, limit=request.args.get('limit', type=int),
+                                             cursor=request.args.get('cursor'), region=request.args.get('region'),
+                                             state=request.args.get('state'), tags=tags, fields=fields)
+    except InvalidCursorError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 502
+    page["success"] = True
+    if page["next_cursor"]:
+        # Cursors are bound to their filters, so the next link repeats them
+        query = request.args.to_dict(flat=False)
+        query["cursor"] = [page["next_cursor"]]
+        # Later pages read what this one synced
+        query.pop("refresh", None)
+        page["links"] = {"next": f"/api/inventory/{kind}?{urlencode(query, doseq=True)}"}
+    return json_response(page)
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+def run_batch():
+    """Run several operations concurrently: POST {"operations": [...]} or GET ?ops=costs,resources"""
+    if request.method == 'POST':
+        names = (request.json or {}).get('operations', [])
+    else:
+        names = [name for name in request.args.get('ops', '').split(',') if name]
+    if not names:
+        return jsonify({"success": False, "error": "No operations requested",
+                        "operations": sorted(batch.operations)}), 400
+    try:
+        result = batch.run(names)
+    except UnknownOperationError as e:
+        return jsonify({"success": False, "error": str(e), "operations": sorted(batch.operations)}), 400
+    return jsonify(result)
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Start a script as a background job and return its id"""
+    data = request.json or {}
+    script = data.get('script')
+    args = [str(arg) for arg in data.get('args', [])]
+    if script not in SCRIPTS:
+        return jsonify({"success": False, "error": f"Unknown script: {script}"}), 400
+    try:
+        job = submit_script(script, args)
+    except QueueFullError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+    return jsonify(job_status(job)), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Recent jobs, newest first"""
+    return jsonify({"jobs": [job_status(job, detail=False) for job in jobs.list()], "counts": jobs.stats()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status and result; ?wait=N long-polls up to N seconds for completion"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job"}), 404
+    wait = min(request.args.get('wait', 0, type=float), 60)
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job_status(job))
+
+@app.route('/api/stream/<script>', methods=['GET'])
+def stream_script(script):
+    """Server-sent events with each output line and progress as the script produces them
+
+    A reusable read-only result arrives as a single `end` event with the
+    whole output; viewers of a run already in progress follow that run.
+    """
+    if script not in STREAMABLE:
+        return jsonify({"success": False, "error": f"Unknown script: {script}"}), 400
+    try:
+        events = executor.stream(script, request.args.getlist('arg'), fresh=request.args.get('refresh') == '1')
+    except SlotBusyError as e:
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+
+    def frames():
+        try:
+            for event, data in events:
+                yield sse(event, data)
+        finally:
+            # Leaving unsubscribes this viewer from the shared run
+            events.close()
+
+    return Response(frames(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if sys.argv[1:] == ['serve']:
+        from wsgi_server import serve
+        serve('api.server:app')
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=True)
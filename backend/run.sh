@@ -23,7 +23,7 @@ fi
 
 # Load environment variables
 export FLASK_APP=api/server.py
-export FLASK_ENV=development
+export FLASK_ENV="${FLASK_ENV:-development}"
 export PYTHONPATH="${PYTHONPATH:-}:$(pwd)"
 
 # Start server
@@ -35,7 +35,17 @@ echo "  GET  /api/billing"
 echo "  GET  /api/audit/cloudfront"
 echo "  POST /api/mfa"
 echo "  GET  /api/integrations"
-
-python3 api/server.py
+echo "  GET  /api/inventory/<ec2|lambda|s3>?cursor=&region=&state=&tag=K=V&fields=..."
+echo "  GET  /api/batch?ops=costs,resources,security,forecast (one round trip)"
+echo "  POST /api/jobs            (start a script as a background job)"
+echo "  GET  /api/jobs/<id>?wait=N (poll a job)"
+echo "  GET  /api/stream/<script>  (server-sent output events)"
+
+if [[ "$FLASK_ENV" == "production" ]]; then
+    # Multi-worker gunicorn; SIGHUP reloads gracefully
+    python3 api/server.py serve
+else
+    python3 api/server.py
+fi
 
 ci_log_summary "Run Step Completed: $(date)"
\ No newline at end of file
@@ -4,77 +4,68 @@
 # @brief AWS service layer for backend operations
 # @description Python wrapper for AWS operations
 
-import boto3
 import json
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Shared client pool lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from aws_client import get_pool
+from aws_resources import count, iter_ec2_instances, iter_lambda_functions, iter_s3_buckets
+from cost_ledger import CostLedger, get_ledger
+from inventory import get_inventory
+from s3_audit import S3ExposureAudit
 
 class AWSService:
-    def __init__(self):
-        self.session = boto3.Session()
+    @property
+    def session(self):
+        """The pooled boto3 session, built on first use so a bad AWS_PROFILE can't stop the server loading"""
+        return get_pool().session()
     
     def get_resources_summary(self):
         """Get AWS resources summary"""
         try:
-            ec2 = self.session.client('ec2')
-            s3 = self.session.client('s3')
-            lambda_client = self.session.client('lambda')
-            
             return {
-                "ec2_instances": len(ec2.describe_instances()['Reservations']),
-                "s3_buckets": len(s3.list_buckets()['Buckets']),
-                "lambda_functions": len(lambda_client.list_functions()['Functions']),
+                "ec2_instances": count(iter_ec2_instances()),
+                "s3_buckets": count(iter_s3_buckets()),
+                "lambda_functions": count(iter_lambda_functions()),
                 "timestamp": datetime.now().isoformat()
             }
         except Exception as e:
             return {"error": str(e)}
     
+    def get_inventory(self, kind, limit=None, cursor=None, region=None, state=None, tags=None, fields=None):
+        """One page of the indexed resource inventory (ec2, lambda or s3)"""
+        return get_inventory().page(kind, limit=limit, cursor=cursor, region=region, state=state,
+                                    tags=tags, fields=fields)
+    
     def get_cost_data(self, days=30):
-        """Get cost data from Cost Explorer"""
+        """Get cost data from the local Cost Explorer ledger"""
         try:
-            ce = self.session.client('ce')
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=days)
-            
-            response = ce.get_cost_and_usage(
-                TimePeriod={
-                    'Start': start_date.strftime('%Y-%m-%d'),
-                    'End': end_date.strftime('%Y-%m-%d')
-                },
-                Granularity='MONTHLY',
-                Metrics=['BlendedCost']
-            )
+            table = get_ledger().table(days=days)
+            start_date, end_date = CostLedger.window(days)
+            summary = table.summary()
             
             return {
-                "total_cost": response['ResultsByTime'][0]['Total']['BlendedCost']['Amount'],
-                "currency": response['ResultsByTime'][0]['Total']['BlendedCost']['Unit'],
-                "period": f"{start_date} to {end_date}"
+                "total_cost": f"{table.total():.2f}",
+                "currency": table.unit,
+                "period": f"{start_date} to {end_date}",
+                "top_services": summary['top_services'],
+                "by_" + table.dimension.lower(): summary['by_group'],
+                "daily": summary['daily']
             }
         except Exception as e:
             return {"error": str(e)}
     
     def get_security_findings(self):
-        """Get basic security findings"""
-        findings = []
-        
+        """Get public-exposure findings for every S3 bucket"""
         try:
-            # Check for public S3 buckets
-            s3 = self.session.client('s3')
-            buckets = s3.list_buckets()['Buckets']
-            
-            for bucket in buckets[:5]:  # Limit to 5 for demo
-                try:
-                    acl = s3.get_bucket_acl(Bucket=bucket['Name'])
-                    for grant in acl['Grants']:
-                        if grant['Grantee'].get('URI') == 'http://acs.amazonaws.com/groups/global/AllUsers':
-                            findings.append({
-                                "type": "public_s3_bucket",
-                                "resource": bucket['Name'],
-                                "severity": "HIGH"
-                            })
-                except:
-                    pass
-                    
+            result = S3ExposureAudit().run()
+            return {
+                "findings": result['findings'],
+                "errors": result['errors'],
+                "buckets_audited": result['buckets_audited']
+            }
         except Exception as e:
-            findings.append({"error": str(e)})
-            
-        return {"findings": findings}
\ No newline at end of file
+            return {"findings": [], "errors": [{"error": str(e)}]}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# @file backend/services/batch.py
+# @brief Run several named analyses concurrently for one request
+# @description Shared deadline, per-operation status, latency bounded by the slowest operation
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from pathlib import Path
+
+# SingleFlight lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from single_flight import SingleFlight
+
+DEFAULT_BATCH_WORKERS = int(os.environ.get('AWS_MGMT_BATCH_WORKERS', '8'))
+
+
+class UnknownOperationError(ValueError):
+    pass
+
+
+class BatchRunner:
+    """Run registered operations side by side and collect their results
+
+    Operations are zero-argument callables. They run in this process, so
+    they share its AWS client pool, response cache and script executor
+    with every other request. Concurrent batches share one run per
+    operation, so a slow AWS never gets the same call from each of them.
+    A batch waits at most `timeout` seconds in total; operations still
+    running then are reported as 'timeout' and finish in the background,
+    warming the caches for the next request, while ones that never got a
+    worker are cancelled.
+    """
+
+    def __init__(self, operations, timeout, workers=DEFAULT_BATCH_WORKERS):
+        self.operations = operations
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+        self._flight = SingleFlight(name='batch')
+
+    def run(self, names):
+        """{'results': {name: {'status', 'result'|'error', 'elapsed_ms'}}, 'degraded', 'elapsed_ms'}
+
+        The batch itself succeeds whenever it ran; operations that failed or
+        timed out are reported in their own entry and mark it degraded.
+        """
+        unknown = [name for name in names if name not in self.operations]
+        if unknown:
+            raise UnknownOperationError(f"Unknown operation(s): {', '.join(unknown)}")
+
+        start = time.time()
+        # Duplicates run once
+        futures = {name: self._executor.submit(_timed, self._flight.do, name, self.operations[name])
+                   for name in dict.fromkeys(names)}
+
+        results = {}
+        for name, future in futures.items():
+            remaining = max(0.0, start + self.timeout - time.time())
+            try:
+                value, elapsed = future.result(timeout=remaining)
+            except TimeoutError:
+                # Queued behind other work: drop it rather than run it for nobody
+                started = not future.cancel()
+                results[name] = {'status': 'timeout', 'error': f'no answer within {self.timeout}s'
+                                 + ('' if started else ' (never started)')}
+                continue
+            except Exception as e:
+                results[name] = {'status': 'error', 'error': str(e)}
+                continue
+            # Script results and AWSService report failures in the result instead of raising
+            ok = not isinstance(value, dict) or value.get('success', 'error' not in value)
+            results[name] = {'status': 'ok' if ok else 'error', 'result': value,
+                             'elapsed_ms': round(elapsed * 1000, 1)}
+
+        return {
+            'success': True,
+            'degraded': any(r['status'] != 'ok' for r in results.values()),
+            'results': results,
+            'elapsed_ms': round((time.time() - start) * 1000, 1)
+        }
+
+
+def _timed(operation, *args):
+    start = time.time()
+    value = operation(*args)
+    return value, time.time() - start
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+# @file backend/services/job_queue.py
+# @brief Asynchronous job subsystem for long-running scripts
+# @description Bounded worker pool plus an in-memory result store with retention
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = int(os.environ.get('AWS_MGMT_JOB_WORKERS', '4'))
+DEFAULT_RETENTION = int(os.environ.get('AWS_MGMT_JOB_RETENTION', '3600'))
+MAX_JOBS = int(os.environ.get('AWS_MGMT_MAX_JOBS', '1000'))
+
+FINISHED = ('completed', 'failed')
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name, params, persist=True):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.params = params
+        self.persist = persist
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data['name'], data['params'])
+        job.id = data['job_id']
+        for field in ('status', 'result', 'error', 'created', 'started', 'finished'):
+            setattr(job, field, data[field])
+        if job.done:
+            job._done.set()
+        return job
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or timeout passes; True if finished"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": round((self.finished or time.time()) - self.started, 3) if self.started else None
+        }
+
+
+class JobQueue:
+    """Run jobs on a bounded worker pool and keep their results for `retention` seconds
+
+    submit() returns immediately with a Job; at most `workers` jobs run at
+    once and the rest wait in the queue. Finished jobs are purged once
+    older than `retention`, and submissions are refused once `max_jobs`
+    jobs are queued or retained.
+
+    With a `store` (the shared ResponseCache), job records are also
+    written there, so any server worker can answer a poll for a job
+    another worker runs; their keys include `account()`.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, retention=DEFAULT_RETENTION, max_jobs=MAX_JOBS, store=None,
+                 account=None):
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self.store = store
+        self.account = account or (lambda: None)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, params, fn, persist=True):
+        """Queue fn(job) and return the Job; fn's return value becomes job.result
+
+        Jobs handling secrets pass persist=False to stay out of the shared store.
+        """
+        job = Job(name, params, persist)
+        with self._lock:
+            self._purge()
+            if len(self._jobs) >= self.max_jobs:
+                raise QueueFullError(f"Job queue full ({self.max_jobs} jobs)")
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        job.status = 'running'
+        job.started = time.time()
+        self._persist(job)
+        try:
+            result, error, status = fn(job), None, 'completed'
+        except Exception as e:
+            result, error, status = None, str(e), 'failed'
+        # finished before status: _purge() treats any finished status as done
+        job.result, job.error = result, error
+        job.finished = time.time()
+        job.status = status
+        self._persist(job)
+        job._done.set()
+
+    def _store_key(self, job_id):
+        return self.store.make_key(self.account(), None, 'job', job_id)
+
+    def _persist(self, job):
+        if self.store is None or not job.persist:
+            return
+        # Unfinished records outlive the retention window until the job ends
+        ttl = self.retention if job.done else self.retention + 86400
+        try:
+            self.store.set(self._store_key(job.id), 'job', job.to_dict(), ttl=ttl)
+        except Exception:
+            pass
+
+    def get(self, job_id):
+        """The job, from this process or (with a store) from whichever worker runs it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            data = self.store.get(self._store_key(job_id))
+            job = StoredJob(self, data) if data else None
+        return job
+
+    def list(self):
+        with self._lock:
+            self._purge()
+            return sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished is not None and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+
+class StoredJob(Job):
+    """A job run by another worker, read back from the shared store"""
+
+    def __init__(self, queue, data):
+        self.__dict__.update(Job.from_dict(data).__dict__)
+        self._queue = queue
+
+    def wait(self, timeout=None):
+        """Poll the store until the job finishes or timeout passes"""
+        deadline = time.time() + (timeout or 0)
+        while not self.done and time.time() < deadline:
+            time.sleep(0.5)
+            data = self._queue.store.get(self._queue._store_key(self.id))
+            if data:
+                self.__dict__.update(Job.from_dict(data).__dict__)
+        return self.done
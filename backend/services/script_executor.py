@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+# @file backend/services/script_executor.py
+# @brief Bounded, de-duplicating executor for the shell scripts behind the API
+# @description Per-script concurrency caps, in-flight sharing and short result caching
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# SingleFlight lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from metrics import CACHE_LOOKUPS, SUBPROCESS_SECONDS
+from single_flight import SingleFlight
+
+from services.script_stream import SharedRun
+
+DEFAULT_SCRIPT_LIMIT = int(os.environ.get('AWS_MGMT_SCRIPT_CONCURRENCY', '2'))
+MAX_PROCESSES = int(os.environ.get('AWS_MGMT_MAX_PROCESSES', '8'))
+# How long a new stream waits for a process slot before the request is turned away
+SLOT_WAIT = float(os.environ.get('AWS_MGMT_STREAM_SLOT_WAIT', '5'))
+
+# Read-only scripts whose successful output may be reused for a while (seconds)
+READ_ONLY_TTLS = {
+    'billing.sh': int(os.environ.get('AWS_MGMT_BILLING_TTL', '60')),
+    'aws_manager.sh': int(os.environ.get('AWS_MGMT_RESOURCES_TTL', '60'))
+}
+
+
+class SlotBusyError(Exception):
+    """Raised when no process slot frees up within the wait"""
+
+
+class ScriptExecutor:
+    """Run scripts with at most `limit` concurrent processes per script and `max_processes` overall
+
+    Identical invocations (same script and arguments) that overlap share a
+    single process. Successful results of read-only scripts are reused for
+    their TTL, so a burst of dashboard requests forks once; with a `store`
+    (the shared ResponseCache) that reuse spans every server worker
+    running as the same `account()`.
+
+    stream() serves the same reusable results as a single `end` event, and
+    viewers of an invocation that is already streaming follow that run
+    instead of starting another process.
+    """
+
+    def __init__(self, script_dir, timeout, limits=None, default_limit=DEFAULT_SCRIPT_LIMIT,
+                 max_processes=MAX_PROCESSES, ttls=None, store=None, account=None):
+        self.script_dir = script_dir
+        self.store = store
+        self.account = account or (lambda: None)
+        self.timeout = timeout
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self.ttls = READ_ONLY_TTLS if ttls is None else ttls
+        self._processes = threading.BoundedSemaphore(max_processes)
+        self._slots = {}
+        self._flights = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _slot_for(self, script):
+        with self._lock:
+            if script not in self._slots:
+                self._slots[script] = threading.BoundedSemaphore(self.limits.get(script, self.default_limit))
+                self._flights[script] = SingleFlight(ttl=self.ttls.get(script, 0),
+                                                     cacheable=lambda result: result.get('success'),
+                                                     name=f'script:{script}')
+            return self._slots[script]
+
+    @contextmanager
+    def slot(self, script):
+        """Hold one of the script's process slots (and a global one) for the block"""
+        script_slot = self._slot_for(script)
+        with script_slot, self._processes:
+            yield
+
+    def acquire(self, script, timeout):
+        """Take one of the script's process slots and a global one, waiting at most timeout seconds"""
+        script_slot = self._slot_for(script)
+        deadline = time.monotonic() + timeout
+        if not script_slot.acquire(timeout=timeout):
+            return False
+        if not self._processes.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            script_slot.release()
+            return False
+        return True
+
+    def release(self, script):
+        """Give back the slots taken by acquire()"""
+        self._processes.release()
+        self._slots[script].release()
+
+    @contextmanager
+    def held(self, script):
+        """Release the slots taken by acquire() when the block ends"""
+        try:
+            yield
+        finally:
+            self.release(script)
+
+    def command(self, script, args):
+        return [f"{self.script_dir}/{script}"] + list(args)
+
+    def _store_key(self, script, key):
+        if self.store and self.ttls.get(script, 0):
+            return self.store.make_key(self.account(), None, f'script:{script}', list(key))
+        return None
+
+    def _shared(self, store_key):
+        """Result another worker stored under store_key, or None"""
+        shared = self.store.get(store_key)
+        CACHE_LOOKUPS.inc(cache='script_results', result='miss' if shared is None else 'hit')
+        return shared
+
+    def _share(self, script, store_key, result):
+        if store_key and result.get('success'):
+            self.store.set(store_key, f'script:{script}', result, ttl=self.ttls[script])
+
+    def run(self, script, args=(), fresh=False):
+        """Run (or join, or reuse) `script args` and return the result dict"""
+        self._slot_for(script)
+        key = tuple(str(arg) for arg in args)
+        store_key = self._store_key(script, key)
+        if store_key and not fresh:
+            shared = self._shared(store_key)
+            if shared is not None:
+                return shared
+
+        def execute():
+            result = self._execute(script, key)
+            self._share(script, store_key, result)
+            return result
+
+        return self._flights[script].do(key, execute, fresh=fresh)
+
+    def stream(self, script, args=(), fresh=False, slot_wait=SLOT_WAIT):
+        """Generator of (event, data) for `script args`, as script_stream.stream_process yields them
+
+        A reusable result comes back as one `end` event carrying the whole
+        output; otherwise the caller follows the run already streaming
+        this invocation, or a new one. A new run needs a process slot right
+        away: SlotBusyError is raised when none frees up within `slot_wait`
+        seconds, so a request thread never waits out another script.
+        """
+        self._slot_for(script)
+        key = tuple(str(arg) for arg in args)
+        store_key = self._store_key(script, key)
+        if not fresh and self.ttls.get(script, 0):
+            cached = self._flights[script].peek(key)
+            if cached is None and store_key:
+                cached = self._shared(store_key)
+            if cached is not None:
+                return _replay(cached)
+
+        with self._lock:
+            run = self._streams.get((script, key))
+            if run is not None:
+                return run.follow()
+        if not self.acquire(script, slot_wait):
+            raise SlotBusyError(f"No free process slot for {script}; try again shortly")
+
+        def finished(run):
+            with self._lock:
+                self._streams.pop((script, key), None)
+            result = run.result()
+            self._flights[script].put(key, result)
+            self._share(script, store_key, result)
+
+        with self._lock:
+            run = self._streams.get((script, key))
+            if run is None:
+                run = self._streams[(script, key)] = SharedRun(
+                    self.command(script, key), timeout=self.timeout,
+                    keep_running=bool(self.ttls.get(script, 0)), on_end=finished)
+                viewer = run.follow()
+                run.start(self.held(script))
+                return viewer
+        # Another viewer started this invocation while we waited for the slot
+        self.release(script)
+        return run.follow()
+
+    def _execute(self, script, args):
+        with self.slot(script):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = subprocess.run(self.command(script, args), capture_output=True, text=True,
+                                        timeout=self.timeout)
+                outcome = 'ok' if result.returncode == 0 else 'failed'
+                return {
+                    "success": result.returncode == 0,
+                    "output": result.stdout,
+                    "error": result.stderr,
+                    "exit_code": result.returncode,
+                    "finished_at": time.time()
+                }
+            except subprocess.TimeoutExpired as e:
+                outcome = 'timeout'
+                return {"success": False, "error": str(e)}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            finally:
+                SUBPROCESS_SECONDS.observe(time.perf_counter() - start, command=script, outcome=outcome)
+
+    def max_age(self, script, result):
+        """Seconds `result` stays reusable under the script's TTL (0 for uncached scripts and failures)"""
+        ttl = self.ttls.get(script, 0)
+        if not ttl or not result.get('success') or 'finished_at' not in result:
+            return 0
+        return max(0, ttl - (time.time() - result['finished_at']))
+
+    def stats(self):
+        with self._lock:
+            stats = {script: flight.stats() for script, flight in self._flights.items()}
+            for (script, _), run in self._streams.items():
+                stats[script]['streaming_viewers'] = stats[script].get('streaming_viewers', 0) + run.viewers
+            return stats
+
+
+def _replay(result):
+    """A stored result as the single `end` event of a stream"""
+    yield 'end', {'success': result.get('success', False), 'exit_code': result.get('exit_code'),
+                  'output': result.get('output', ''), 'error': result.get('error'), 'cached': True}
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# @file backend/services/script_stream.py
+# @brief Incremental script output for server-sent events
+# @description Non-blocking pipe reads that yield output lines and progress events as they happen
+
+import json
+import os
+import re
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# The metrics registry lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from metrics import SUBPROCESS_SECONDS
+
+READ_CHUNK = 64 * 1024
+# Lines longer than this are emitted in pieces so a single line can't grow unbounded
+MAX_LINE = 64 * 1024
+HEARTBEAT = 15
+
+# "[3/10]", "3 of 10", "Progress: 30%" style lines become structured progress events
+PROGRESS_PATTERNS = [
+    re.compile(r'\[(\d+)/(\d+)\]'),
+    re.compile(r'\b(\d+) of (\d+)\b'),
+    re.compile(r'[Pp]rogress\D{0,10}(\d{1,3})%')
+]
+
+
+def parse_progress(line):
+    """{'current', 'total', 'percent'} for progress-looking lines, else None"""
+    for pattern in PROGRESS_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        if len(match.groups()) == 2:
+            current, total = int(match.group(1)), int(match.group(2))
+            if total:
+                return {'current': current, 'total': total, 'percent': round(100 * current / total, 1)}
+        else:
+            return {'percent': min(100, int(match.group(1)))}
+    return None
+
+
+def stream_process(cmd, timeout=None):
+    """Run cmd and yield (event, data) as output arrives
+
+    Events: start {pid}, stdout/stderr {line}, progress {...},
+    heartbeat {} while idle, end {exit_code, duration, lines}. stdout and
+    stderr are read with non-blocking reads through a selector, so
+    memory holds at most one partial line per pipe. Closing the generator
+    (client disconnect) kills the process.
+    """
+    start = time.time()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    selector = selectors.DefaultSelector()
+    buffers = {}
+    for name, pipe in (('stdout', process.stdout), ('stderr', process.stderr)):
+        os.set_blocking(pipe.fileno(), False)
+        selector.register(pipe, selectors.EVENT_READ, name)
+        buffers[name] = b''
+    lines = 0
+    timed_out = False
+    outcome = 'error'
+
+    try:
+        yield 'start', {'pid': process.pid}
+        last_event = time.time()
+        while selector.get_map():
+            if timeout and time.time() - start > timeout:
+                timed_out = True
+                process.kill()
+                break
+            ready = selector.select(timeout=1)
+            if not ready and time.time() - last_event >= HEARTBEAT:
+                last_event = time.time()
+                yield 'heartbeat', {}
+            for key, _ in ready:
+                name = key.data
+                try:
+                    chunk = os.read(key.fd, READ_CHUNK)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    if buffers[name]:
+                        pending, buffers[name] = [buffers[name]], b''
+                    else:
+                        continue
+                else:
+                    buffers[name] += chunk
+                    *pending, buffers[name] = buffers[name].split(b'\n')
+                    if len(buffers[name]) > MAX_LINE:
+                        pending.append(buffers[name])
+                        buffers[name] = b''
+                for raw in pending:
+                    line = raw.decode('utf-8', errors='replace').rstrip('\r')
+                    lines += 1
+                    last_event = time.time()
+                    yield name, {'line': line}
+                    progress = parse_progress(line) if name == 'stdout' else None
+                    if progress:
+                        yield 'progress', progress
+        exit_code = process.wait()
+        end = {'exit_code': exit_code, 'success': exit_code == 0,
+               'duration': round(time.time() - start, 3), 'lines': lines}
+        outcome = 'timeout' if timed_out else 'ok' if exit_code == 0 else 'failed'
+        if timed_out:
+            end['error'] = f'Timed out after {timeout}s'
+        yield 'end', end
+    except GeneratorExit:
+        # The client went away (generator closed) before the script finished
+        if outcome == 'error':
+            outcome = 'cancelled'
+        raise
+    finally:
+        SUBPROCESS_SECONDS.observe(time.time() - start, command=os.path.basename(cmd[0]), outcome=outcome)
+        selector.close()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+
+
+class SharedRun:
+    """One streamed script run that any number of viewers follow
+
+    The process is read on its own thread, and every event is kept, so a
+    viewer joining late first gets the output so far and then the rest
+    live. When the last viewer leaves, the process is killed unless
+    `keep_running` (a read-only script whose result is worth caching).
+    `on_end(run)` is called once the run is over.
+    """
+
+    def __init__(self, cmd, timeout=None, keep_running=False, on_end=None):
+        self.cmd = cmd
+        self.timeout = timeout
+        self.keep_running = keep_running
+        self.on_end = on_end
+        self.events = []
+        self.viewers = 0
+        self.done = False
+        self._cond = threading.Condition()
+
+    def start(self, slot):
+        """Run the process on a daemon thread inside `slot` (a context manager holding its process slots)"""
+        threading.Thread(target=self._produce, args=(slot,), name='script-stream', daemon=True).start()
+        return self
+
+    def _produce(self, slot):
+        try:
+            with slot:
+                frames = stream_process(self.cmd, timeout=self.timeout)
+                try:
+                    for event, data in frames:
+                        with self._cond:
+                            if event != 'heartbeat':
+                                self.events.append((event, data))
+                                self._cond.notify_all()
+                            abandoned = self.viewers == 0 and not self.keep_running
+                        if abandoned:
+                            break
+                finally:
+                    # Kills the process if it is still running
+                    frames.close()
+        except OSError as e:
+            with self._cond:
+                self.events.append(('end', {'success': False, 'error': str(e)}))
+        finally:
+            with self._cond:
+                if not self.events or self.events[-1][0] != 'end':
+                    self.events.append(('end', {'success': False, 'error': 'Cancelled: every viewer left'}))
+                self.done = True
+                self._cond.notify_all()
+            if self.on_end:
+                self.on_end(self)
+
+    def follow(self):
+        """Generator of (event, data) for one viewer, counted as watching from this call on"""
+        with self._cond:
+            self.viewers += 1
+        return self._follow()
+
+    def _follow(self):
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    if index >= len(self.events) and not self.done:
+                        self._cond.wait(HEARTBEAT)
+                    pending = self.events[index:]
+                    index += len(pending)
+                    finished = self.done and index >= len(self.events)
+                if not pending and not finished:
+                    yield 'heartbeat', {}
+                yield from pending
+                if finished:
+                    return
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def result(self):
+        """The finished run as a ScriptExecutor.run() result dict"""
+        with self._cond:
+            events = list(self.events)
+        end = events[-1][1]
+        stderr = '\n'.join(data['line'] for event, data in events if event == 'stderr')
+        return {
+            "success": bool(end.get('success')),
+            "output": '\n'.join(data['line'] for event, data in events if event == 'stdout'),
+            "error": end.get('error') or stderr,
+            "exit_code": end.get('exit_code'),
+            "finished_at": time.time()
+        }
+
+
+def sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
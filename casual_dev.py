@@ -6,8 +6,10 @@ Simple, friendly tool for developers who just want things to work
 No jargon, no complexity - just practical help
 """
 
-import json
-import subprocess
+import sqlite3
+
+from aws_client import AWSClientError
+from cost_ledger import get_ledger
 
 class CasualDevHelper:
     def __init__(self):
@@ -27,34 +29,17 @@ class CasualDevHelper:
         
         # Try to get real data, fallback to examples
         try:
-            result = subprocess.run(['aws', 'ce', 'get-cost-and-usage', 
-                                   '--time-period', 'Start=2024-06-01,End=2024-07-01',
-                                   '--granularity', 'MONTHLY', '--metrics', 'BlendedCost',
-                                   '--group-by', 'Type=DIMENSION,Key=SERVICE'], 
-                                  capture_output=True, text=True, timeout=10)
-        except FileNotFoundError:
-            print("💡 AWS CLI not found. Install with: pip install awscli")
-            self._show_example_costs()
-            return
-        except Exception as e:
+            services = get_ledger().by_service(days=30)
+        except (AWSClientError, OSError, sqlite3.Error, ValueError) as e:
+            # No credentials, an unwritable/broken ledger database, or a bad cost dimension
             print(f"⚠️ Couldn't fetch real costs: {str(e)}")
             self._show_example_costs()
             return
         
-        try:
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                services = data.get('ResultsByTime', [{}])[0].get('Groups', [])
-                for service in services[:5]:
-                    service_name = service['Keys'][0]
-                    cost = float(service['Metrics']['BlendedCost']['Amount'])
-                    if cost > 0.01:
-                        friendly_name = self.friendly_names.get(service_name.lower(), service_name)
-                        print(f"  • {friendly_name}: ${cost:.2f}")
-            else:
-                self._show_example_costs()
-        except:
-            self._show_example_costs()
+        for service_name, cost in list(services.items())[:5]:
+            if cost > 0.01:
+                friendly_name = self.friendly_names.get(service_name.lower(), service_name)
+                print(f"  • {friendly_name}: ${cost:.2f}")
     
     def _show_example_costs(self):
         """Show example costs when real data isn't available"""
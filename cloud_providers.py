@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""
+Cloud Provider Adapters
+One cost interface per cloud, collected concurrently with per-provider deadlines
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from cost_ledger import get_ledger
+
+DEFAULT_DEADLINE = float(os.environ.get('AWS_MGMT_PROVIDER_DEADLINE', '5'))
+
+# Shared so a provider that overruns its deadline never blocks a later collection's shutdown
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='provider')
+
+
+class CloudProvider:
+    """Adapter interface: monthly_cost() returns the provider's cost for the last 30 days
+
+    `deadline` is how long a collection waits for this provider; `fallback`
+    is the figure reported when it errors or overruns (None leaves it out).
+    """
+
+    name = None
+    fallback = None
+
+    def __init__(self, deadline=None, fallback=None):
+        self.deadline = deadline if deadline is not None else DEFAULT_DEADLINE
+        if fallback is not None:
+            self.fallback = fallback
+
+    def monthly_cost(self):
+        raise NotImplementedError
+
+
+class AWSProvider(CloudProvider):
+    name = 'aws'
+    fallback = 150.0
+
+    def monthly_cost(self):
+        return get_ledger().total(days=30)
+
+
+class AzureProvider(CloudProvider):
+    """Simulated Azure costs - would use Azure CLI"""
+
+    name = 'azure'
+    fallback = 120.0
+
+    def monthly_cost(self):
+        return 120.0
+
+
+class GCPProvider(CloudProvider):
+    """Simulated GCP costs - would use gcloud"""
+
+    name = 'gcp'
+    fallback = 100.0
+
+    def monthly_cost(self):
+        return 100.0
+
+
+class FakeProvider(CloudProvider):
+    """Local provider with a fixed cost, latency and optional failure for testing"""
+
+    def __init__(self, name, cost, delay=0.0, error=None, deadline=None, fallback=None):
+        super().__init__(deadline, fallback)
+        self.name = name
+        self.cost = cost
+        self.delay = delay
+        self.error = error
+
+    def monthly_cost(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.cost
+
+
+def default_providers():
+    """Real adapters, or fakes when AWS_MGMT_FAKE_PROVIDERS=1"""
+    if os.environ.get('AWS_MGMT_FAKE_PROVIDERS') == '1':
+        return [FakeProvider('aws', 150.0, delay=0.05), FakeProvider('azure', 120.0, delay=0.02),
+                FakeProvider('gcp', 100.0, delay=0.03)]
+    return [AWSProvider(), AzureProvider(), GCPProvider()]
+
+
+def collect_costs(providers):
+    """Query every provider at once; each gets its own deadline from the common start
+
+    Returns {'costs': {name: cost}, 'providers': {name: status}, 'degraded': bool}.
+    A provider that errors or misses its deadline is reported with status
+    'error' or 'timeout' and its fallback cost (if any), and the result is
+    marked degraded instead of waiting on it.
+    """
+    start = time.time()
+    futures = [(provider, _executor.submit(_timed, provider)) for provider in providers]
+
+    costs = {}
+    statuses = {}
+    for provider, future in sorted(futures, key=lambda item: item[0].deadline):
+        remaining = max(0.0, start + provider.deadline - time.time())
+        try:
+            cost, latency = future.result(timeout=remaining)
+            costs[provider.name] = cost
+            statuses[provider.name] = {'status': 'ok', 'latency_ms': round(latency * 1000, 1)}
+            continue
+        except TimeoutError:
+            status = {'status': 'timeout', 'error': f'no answer within {provider.deadline}s'}
+        except Exception as e:
+            status = {'status': 'error', 'error': str(e)}
+        if provider.fallback is not None:
+            costs[provider.name] = provider.fallback
+            status['fallback'] = provider.fallback
+        statuses[provider.name] = status
+
+    return {
+        'costs': costs,
+        'providers': {provider.name: statuses[provider.name] for provider in providers},
+        'degraded': any(s['status'] != 'ok' for s in statuses.values()),
+        'elapsed_ms': round((time.time() - start) * 1000, 1)
+    }
+
+
+def _timed(provider):
+    start = time.time()
+    cost = provider.monthly_cost()
+    return cost, time.time() - start
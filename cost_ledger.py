@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+Incremental Cost Ledger
+Local daily cost table synced from Cost Explorer, so cost views stop re-querying whole windows
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from aws_client import AWSClient
+from cost_table import DEFAULT_DIMENSION, CostTable, fetch_rows
+from response_cache import CACHE_DIR, refresh_requested
+
+DEFAULT_HISTORY_DAYS = int(os.environ.get('AWS_MGMT_LEDGER_DAYS', '62'))
+# Cost Explorer keeps revising the last few days as usage is settled
+RESETTLE_DAYS = 3
+# Cost Explorer itself refreshes about three times a day
+MIN_SYNC_INTERVAL = 4 * 3600
+SCHEMA_VERSION = 2
+
+
+def _day(value):
+    return value if isinstance(value, str) else value.strftime('%Y-%m-%d')
+
+
+class CostLedger:
+    """Per-account daily cost by service and `dimension`, stored in SQLite
+
+    sync() only asks Cost Explorer for days newer than the last sync plus
+    the re-settlement window, and only for older days when more history is
+    requested than the ledger holds. Each fetch groups by SERVICE and the
+    second dimension (REGION by default), so every cost view is then a
+    local SUM over `daily_costs` or a rollup of table().
+    """
+
+    def __init__(self, path=None, profile=None, history_days=DEFAULT_HISTORY_DAYS,
+                 resettle_days=RESETTLE_DAYS, min_sync_interval=MIN_SYNC_INTERVAL,
+                 dimension=DEFAULT_DIMENSION):
+        self.path = Path(path) if path else CACHE_DIR / 'cost_ledger.db'
+        self.profile = profile
+        self.dimension = dimension
+        self.history_days = history_days
+        self.resettle_days = resettle_days
+        self.min_sync_interval = min_sync_interval
+        self.api_calls = 0
+        self._account = None
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            # The ledger is rebuildable from Cost Explorer; start over on layout changes
+            conn.execute('DROP TABLE IF EXISTS daily_costs')
+            conn.execute('DROP TABLE IF EXISTS sync_state')
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_costs (
+                account TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                day TEXT NOT NULL,
+                service TEXT NOT NULL,
+                grp TEXT NOT NULL,
+                amount REAL NOT NULL,
+                PRIMARY KEY (account, dimension, day, service, grp)
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                account TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                first_day TEXT NOT NULL,
+                end_day TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (account, dimension)
+            )""")
+
+    @property
+    def account(self):
+        if self._account is None:
+            self._account = AWSClient(profile=self.profile).account_id()
+        return self._account
+
+    def _state(self):
+        row = self._conn().execute('SELECT first_day, end_day, unit, synced_at FROM sync_state '
+                                   'WHERE account = ? AND dimension = ?', (self.account, self.dimension)).fetchone()
+        return dict(zip(('first_day', 'end_day', 'unit', 'synced_at'), row)) if row else None
+
+    def sync(self, days=None, force=False):
+        """Bring the ledger up to yesterday (Cost Explorer's End is exclusive of today)
+
+        Returns the number of Cost Explorer requests made.
+        """
+        days = max(days or 0, self.history_days)
+        today = datetime.now(timezone.utc).date()
+        wanted_start = today - timedelta(days=days)
+        force = force or refresh_requested()
+
+        with self._sync_lock:
+            state = self._state()
+            ranges = []
+            if state is None:
+                ranges.append((wanted_start, today))
+            else:
+                first = date.fromisoformat(state['first_day'])
+                end = date.fromisoformat(state['end_day'])
+                if wanted_start < first:
+                    ranges.append((wanted_start, first))
+                stale = time.time() - state['synced_at'] >= self.min_sync_interval
+                if end < today or stale or force:
+                    ranges.append((max(first, min(end, today) - timedelta(days=self.resettle_days)), today))
+
+            calls = 0
+            unit = state['unit'] if state else 'USD'
+            for start, end in ranges:
+                if start < end:
+                    rows, unit, requests = fetch_rows(start, end, self.dimension, self.profile)
+                    self.api_calls += requests
+                    self._store(start, end, rows)
+                    calls += requests
+
+            if ranges:
+                first_day = min([wanted_start] + ([date.fromisoformat(state['first_day'])] if state else []))
+                self._conn().execute(
+                    'INSERT OR REPLACE INTO sync_state (account, dimension, first_day, end_day, unit, synced_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.account, self.dimension, _day(first_day), _day(today), unit, time.time()))
+            return calls
+
+    def _store(self, start, end, rows):
+        """Replace the days in [start, end) so revised and vanished services are reflected"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM daily_costs WHERE account = ? AND dimension = ? AND day >= ? AND day < ?',
+                         (self.account, self.dimension, _day(start), _day(end)))
+            conn.executemany('INSERT OR REPLACE INTO daily_costs (account, dimension, day, service, grp, amount) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             [(self.account, self.dimension) + row for row in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def window(days=None, month_to_date=False):
+        """(start, end) of the last `days` days or of the current month, end exclusive"""
+        end = datetime.now(timezone.utc).date()
+        start = end.replace(day=1) if month_to_date else end - timedelta(days=days or 30)
+        return start, end
+
+    def _range(self, days, month_to_date):
+        start, end = self.window(days, month_to_date)
+        self.sync(days=(end - start).days)
+        return _day(start), _day(end)
+
+    def _select(self, columns, days, month_to_date, tail=''):
+        start, end = self._range(days, month_to_date)
+        return self._conn().execute(f'SELECT {columns} FROM daily_costs '
+                                    f'WHERE account = ? AND dimension = ? AND day >= ? AND day < ? {tail}',
+                                    (self.account, self.dimension, start, end)).fetchall()
+
+    def total(self, days=30, month_to_date=False):
+        """Total cost over the window"""
+        return self._select('COALESCE(SUM(amount), 0)', days, month_to_date)[0][0]
+
+    def by_service(self, days=30, month_to_date=False):
+        """{service: cost} over the window, most expensive first"""
+        return dict(self._select('service, SUM(amount) AS cost', days, month_to_date,
+                                 'GROUP BY service ORDER BY cost DESC'))
+
+    def daily(self, days=30, month_to_date=False):
+        """[(day, cost)] over the window, oldest first"""
+        return self._select('day, SUM(amount)', days, month_to_date, 'GROUP BY day ORDER BY day')
+
+    def table(self, days=30, month_to_date=False):
+        """The window as a columnar CostTable for service/region/account rollups"""
+        rows = self._select('day, service, grp, amount', days, month_to_date)
+        return CostTable(rows, self.dimension, self.unit())
+
+    def unit(self):
+        state = self._state()
+        return state['unit'] if state else 'USD'
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(profile=None):
+    """The process-wide CostLedger for a profile"""
+    with _ledgers_lock:
+        if profile not in _ledgers:
+            _ledgers[profile] = CostLedger(profile=profile)
+        return _ledgers[profile]
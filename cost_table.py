@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Columnar Cost Table
+Daily cost by SERVICE x one more dimension, fetched once and rolled up locally with numpy
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from aws_client import AWSClientError, get_client
+
+DEFAULT_DIMENSION = os.environ.get('AWS_MGMT_COST_DIMENSION', 'REGION')
+DIMENSIONS = ('REGION', 'LINKED_ACCOUNT', 'USAGE_TYPE', 'INSTANCE_TYPE', 'PURCHASE_TYPE')
+METRIC = 'BlendedCost'
+
+
+def fetch_rows(start, end, dimension=DEFAULT_DIMENSION, profile=None, metric=METRIC):
+    """Daily cost grouped by SERVICE and `dimension` for [start, end)
+
+    One GetCostAndUsage request (plus NextPageToken pages) returns every
+    (day, service, dimension value) cell. Returns (rows, unit, requests)
+    with rows as (day, service, group, amount) tuples.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unsupported cost dimension: {dimension}")
+    ce = get_client('ce', region='us-east-1', profile=profile)
+    params = {
+        'TimePeriod': {'Start': str(start), 'End': str(end)},
+        'Granularity': 'DAILY',
+        'Metrics': [metric],
+        'GroupBy': [{'Type': 'DIMENSION', 'Key': 'SERVICE'}, {'Type': 'DIMENSION', 'Key': dimension}]
+    }
+    rows = []
+    unit = 'USD'
+    requests = 0
+    try:
+        while True:
+            response = ce.get_cost_and_usage(**params)
+            requests += 1
+            for result in response.get('ResultsByTime', []):
+                day = result['TimePeriod']['Start']
+                for group in result.get('Groups', []):
+                    amount = group['Metrics'][metric]
+                    unit = amount.get('Unit', unit)
+                    service, value = group['Keys']
+                    rows.append((day, service, value, float(amount['Amount'])))
+            if not response.get('NextPageToken'):
+                break
+            params['NextPageToken'] = response['NextPageToken']
+    except Exception as e:
+        raise AWSClientError(f"ce get_cost_and_usage failed: {e}") from e
+    return rows, unit, requests
+
+
+class CostTable:
+    """Parallel numpy columns (day, service, group, amount)
+
+    Services, groups and days are dictionary-encoded as integer codes, so
+    every rollup is a single np.bincount over the amount column.
+    """
+
+    def __init__(self, rows, dimension=DEFAULT_DIMENSION, unit='USD'):
+        self.dimension = dimension
+        self.unit = unit
+        days, services, groups, amounts = zip(*rows) if rows else ((), (), (), ())
+        self.day_names, self.days = np.unique(np.array(days, dtype=str), return_inverse=True)
+        self.service_names, self.services = np.unique(np.array(services, dtype=str), return_inverse=True)
+        self.group_names, self.groups = np.unique(np.array(groups, dtype=str), return_inverse=True)
+        self.amounts = np.array(amounts, dtype=np.float64)
+
+    @classmethod
+    def fetch(cls, days=30, dimension=DEFAULT_DIMENSION, profile=None):
+        """Build a table for the last `days` days with one Cost Explorer round trip"""
+        end = datetime.now(timezone.utc).date()
+        rows, unit, _ = fetch_rows(end - timedelta(days=days), end, dimension, profile)
+        return cls(rows, dimension, unit)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def _rollup(self, codes, names, top=None):
+        totals = np.bincount(codes, weights=self.amounts, minlength=len(names))
+        order = np.argsort(totals)[::-1]
+        if top:
+            order = order[:top]
+        return {str(names[i]): float(totals[i]) for i in order}
+
+    def total(self):
+        return float(self.amounts.sum())
+
+    def by_service(self, top=None):
+        """{service: cost}, most expensive first"""
+        return self._rollup(self.services, self.service_names, top)
+
+    def by_group(self, top=None):
+        """{region or account: cost}, most expensive first"""
+        return self._rollup(self.groups, self.group_names, top)
+
+    def by_day(self):
+        """{day: cost}, oldest first"""
+        totals = np.bincount(self.days, weights=self.amounts, minlength=len(self.day_names))
+        return {str(day): float(cost) for day, cost in zip(self.day_names, totals)}
+
+    def matrix(self):
+        """Service x group cost matrix with its row and column labels"""
+        cells = self.services * len(self.group_names) + self.groups
+        totals = np.bincount(cells, weights=self.amounts,
+                             minlength=len(self.service_names) * len(self.group_names))
+        return totals.reshape(len(self.service_names), len(self.group_names)), self.service_names, self.group_names
+
+    def where(self, service=None, group=None, since=None):
+        """Sub-table filtered by service, group value and/or first day (inclusive)"""
+        mask = np.ones(len(self.amounts), dtype=bool)
+        if service is not None:
+            mask &= self.service_names[self.services] == service
+        if group is not None:
+            mask &= self.group_names[self.groups] == group
+        if since is not None:
+            mask &= self.day_names[self.days] >= str(since)
+        rows = zip(self.day_names[self.days[mask]], self.service_names[self.services[mask]],
+                   self.group_names[self.groups[mask]], self.amounts[mask])
+        return CostTable(list(rows), self.dimension, self.unit)
+
+    def summary(self, top=5):
+        """Every standard rollup from the one table"""
+        return {
+            'total': round(self.total(), 2),
+            'unit': self.unit,
+            'dimension': self.dimension,
+            'top_services': {k: round(v, 2) for k, v in self.by_service(top).items()},
+            'by_group': {k: round(v, 2) for k, v in self.by_group().items()},
+            'daily': {k: round(v, 2) for k, v in self.by_day().items()}
+        }
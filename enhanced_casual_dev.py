@@ -5,11 +5,14 @@ Enhanced Casual Developer AWS Helper
 Improved version with caching, better error handling, and progress indicators
 """
 
-import json
+import sqlite3
 import subprocess
-import time
 from datetime import datetime, timedelta
 
+from aws_client import AWSClientError, aws_call
+from cost_ledger import get_ledger
+from response_cache import consume_refresh_flag, get_cache
+
 class EnhancedCasualDevHelper:
     def __init__(self):
         self.friendly_names = {
@@ -19,8 +22,6 @@ class EnhancedCasualDevHelper:
             'lambda': 'functions',
             'cloudfront': 'fast delivery'
         }
-        self._cost_cache = {}
-        self._cache_ttl = 300  # 5 minutes
     
     def _show_progress(self, message, duration_estimate=None):
         """Show progress indicator"""
@@ -29,52 +30,35 @@ class EnhancedCasualDevHelper:
             print(f"   (estimated {duration_estimate} seconds)")
     
     def _validate_aws_access(self):
-        """Validate AWS CLI and credentials"""
+        """Validate AWS SDK and credentials"""
         try:
-            result = subprocess.run(['aws', 'sts', 'get-caller-identity'], 
-                                  capture_output=True, text=True, timeout=5)
-            return result.returncode == 0
-        except FileNotFoundError:
-            print("💡 AWS CLI not found. Install with: pip install awscli")
-            return False
-        except:
-            print("⚠️ AWS credentials not configured. Run: aws configure")
+            # Always ask STS; a cached identity would hide expired or missing credentials
+            aws_call('sts', 'get-caller-identity', cache=False)
+            return True
+        except AWSClientError as e:
+            if 'boto3' in str(e):
+                print("💡 AWS SDK not found. Install with: pip install boto3")
+            else:
+                print("⚠️ AWS credentials not configured. Run: aws configure")
             return False
     
     def _get_cached_costs(self):
-        """Get costs with caching"""
-        cache_key = 'monthly_costs'
-        now = time.time()
-        
-        # Check cache
-        if cache_key in self._cost_cache:
-            cached_data, timestamp = self._cost_cache[cache_key]
-            if now - timestamp < self._cache_ttl:
-                print("📊 Using cached data (faster!)")
-                return cached_data
-        
-        # Fetch fresh data
-        self._show_progress("Fetching your AWS costs", 3)
-        
+        """Get {service: cost} for the last 30 days from the local cost ledger"""
         if not self._validate_aws_access():
             return None
-        
+
         try:
-            result = subprocess.run(['aws', 'ce', 'get-cost-and-usage', 
-                                   '--time-period', f'Start={self._get_date(-30)},End={self._get_date(0)}',
-                                   '--granularity', 'MONTHLY', '--metrics', 'BlendedCost',
-                                   '--group-by', 'Type=DIMENSION,Key=SERVICE'], 
-                                  capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                # Cache the result
-                self._cost_cache[cache_key] = (data, now)
-                return data
-        except Exception as e:
+            ledger = get_ledger()
+            api_calls = ledger.api_calls
+            costs = ledger.by_service(days=30)
+        except (AWSClientError, OSError, sqlite3.Error, ValueError) as e:
+            # No credentials, an unwritable/broken ledger database, or a bad cost dimension
             print(f"⚠️ Error fetching costs: {str(e)}")
-        
-        return None
+            return None
+
+        if ledger.api_calls == api_calls:
+            print("📊 Using cached data (faster!)")
+        return costs
     
     def whats_costing_me_money(self):
         """Show what's actually costing money with improved error handling"""
@@ -83,14 +67,11 @@ class EnhancedCasualDevHelper:
         
         cost_data = self._get_cached_costs()
         
-        if cost_data:
-            services = cost_data.get('ResultsByTime', [{}])[0].get('Groups', [])
+        if cost_data is not None:
             total_cost = 0
             
             print("📊 Your actual AWS costs:")
-            for service in services[:5]:
-                service_name = service['Keys'][0]
-                cost = float(service['Metrics']['BlendedCost']['Amount'])
+            for service_name, cost in list(cost_data.items())[:5]:
                 if cost > 0.01:
                     friendly_name = self.friendly_names.get(service_name.lower(), service_name)
                     print(f"  • {friendly_name}: ${cost:.2f}")
@@ -160,8 +141,12 @@ class EnhancedCasualDevHelper:
             print("   Fix: aws configure")
         
         # Cache status
-        cache_count = len(self._cost_cache)
-        print(f"📊 Cache: {cache_count} items stored")
+        cache = get_cache()
+        if cache:
+            stats = cache.stats()
+            print(f"📊 Cache: {stats['entries']} items stored ({stats['size_bytes'] // 1024} KB, {stats['path']})")
+        else:
+            print("📊 Cache: disabled")
         
         # TODO: Add more health checks
         print("\n🎯 Overall Status: Ready to save money!")
@@ -173,6 +158,7 @@ class EnhancedCasualDevHelper:
 def main():
     import sys
     
+    consume_refresh_flag(sys.argv)
     helper = EnhancedCasualDevHelper()
     
     if len(sys.argv) < 2:
@@ -185,6 +171,7 @@ def main():
         print("  health    - System health check")
         print("  emergency - Fix my bill NOW")
         print()
+        print("Add --refresh to bypass cached AWS data")
         print("Example: python3 enhanced_casual_dev.py costs")
         return
     
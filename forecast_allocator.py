@@ -5,10 +5,11 @@ Resource Allocation Based on Estimation/Forecast
 Predictive resource scaling using historical data and trends
 """
 
-import json
 import numpy as np
 from datetime import datetime, timedelta
-import subprocess
+
+from aws_client import aws_call
+from response_cache import consume_refresh_flag
 
 class ForecastAllocator:
     def __init__(self):
@@ -19,15 +20,9 @@ class ForecastAllocator:
         """Collect historical usage data"""
         try:
             # Get EC2 usage
-            result = subprocess.run([
-                'aws', 'ec2', 'describe-instances',
-                '--query', 'Reservations[].Instances[].[InstanceId,InstanceType,State.Name,LaunchTime]',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                instances = json.loads(result.stdout)
-                self.historical_data = self._process_instance_data(instances)
+            instances = aws_call('ec2', 'describe-instances',
+                                 query='Reservations[].Instances[].[InstanceId,InstanceType,State.Name,LaunchTime]')
+            self.historical_data = self._process_instance_data(instances)
         except:
             # Fallback to simulated data
             self.historical_data = self._generate_sample_data()
@@ -247,6 +242,7 @@ class ForecastAllocator:
 def main():
     import sys
     
+    consume_refresh_flag(sys.argv)
     if len(sys.argv) < 2:
         print("Usage: python3 forecast_allocator.py {forecast|allocate|schedule|optimize} [budget]")
         return
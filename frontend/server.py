@@ -2,34 +2,189 @@
 
 # @file frontend/server.py
 # @brief Static file server for frontend
-# @description Simple HTTP server for development
+# @description Threaded HTTP server with strong ETags, cache headers, precompressed variants and sendfile
 
+import gzip
+import hashlib
 import http.server
-import socketserver
 import os
+import re
+import sys
+import threading
 
-PORT = 3000
+PORT = int(os.environ.get('FRONTEND_PORT', '3000'))
 DIRECTORY = "public"
 
+# Files named like app.3f9a1c2e.js never change content, so clients may keep them for a year
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Everything else is revalidated with its ETag on each use
+REVALIDATE = 'no-cache'
+
+# Preference order when the client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE = ('.html', '.js', '.css', '.json', '.svg', '.txt', '.map')
+MIN_COMPRESS_BYTES = 1024
+# Bodies at least this large go out with sendfile instead of read/write copies
+SENDFILE_MIN = 64 * 1024
+
+_etags = {}
+_etags_lock = threading.Lock()
+
+
+def file_etag(path, stat):
+    """Strong ETag from the file's content hash, recomputed only when size or mtime changes"""
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _etags_lock:
+        etag = _etags.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        with _etags_lock:
+            _etags[key] = etag
+    return etag
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts (q > 0)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()[2:] if params.strip().startswith('q=') else '1'
+        try:
+            if float(q) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            pass
+    return accepted
+
+
 class Handler(http.server.SimpleHTTPRequestHandler):
+    # Keep-alive between the page and its assets
+    protocol_version = 'HTTP/1.1'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=DIRECTORY, **kwargs)
-    
+
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
 
+    def send_head(self):
+        """Regular files get validators, cache headers and a precompressed variant if one fits"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split('?', 1)[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            # Redirects, listings and 404s stay with the stock handler
+            return super().send_head()
+
+        variant, encoding = path, None
+        if path.endswith(COMPRESSIBLE):
+            accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+            for name, suffix in ENCODINGS:
+                candidate = path + suffix
+                if name in accepted and os.path.isfile(candidate) and \
+                        os.stat(candidate).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    variant, encoding = candidate, name
+                    break
+
+        try:
+            f = open(variant, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        try:
+            stat = os.fstat(f.fileno())
+            # Strong validators differ per encoding, since the bytes differ
+            etag = file_etag(variant, stat)
+            if encoding:
+                etag = etag[:-1] + f'-{encoding}"'
+            headers = {
+                'ETag': etag,
+                'Cache-Control': IMMUTABLE if HASHED_ASSET.search(path) else REVALIDATE,
+                'Last-Modified': self.date_time_string(stat.st_mtime)
+            }
+            if path.endswith(COMPRESSIBLE):
+                headers['Vary'] = 'Accept-Encoding'
+
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                f.close()
+                self.send_response(304)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return None
+
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Length', str(stat.st_size))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        """Large files go straight from the page cache to the socket"""
+        try:
+            size = os.fstat(source.fileno()).st_size
+        except (AttributeError, OSError):
+            size = 0
+        if size >= SENDFILE_MIN:
+            outputfile.flush()
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
+
+def precompress(directory):
+    """Write .gz (and .br, if brotli is installed) next to every compressible file"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if not name.endswith(COMPRESSIBLE) or os.path.getsize(path) < MIN_COMPRESS_BYTES:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            variants = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli:
+                variants.append(('.br', lambda d: brotli.compress(d, quality=11)))
+            for suffix, compress in variants:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compress(data))
+                written += 1
+    return written
+
+
 if __name__ == "__main__":
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+
+    if sys.argv[1:] == ['precompress']:
+        print(f"🗜️  Wrote {precompress(DIRECTORY)} precompressed files in {DIRECTORY}")
+        sys.exit(0)
+
+    # One thread per connection, so a slow client never blocks the others
+    with http.server.ThreadingHTTPServer(("", PORT), Handler) as httpd:
         print(f"🌐 Frontend server running at http://localhost:{PORT}")
         print(f"📁 Serving files from: {DIRECTORY}")
         print("Press Ctrl+C to stop")
-        
+
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
-            print("\n👋 Server stopped")
\ No newline at end of file
+            print("\n👋 Server stopped")
@@ -17,7 +17,9 @@ createApp({
             mfaToken: '',
             awsProfile: 'default',
             mfaResult: null,
-            auditResult: null
+            auditResult: null,
+            liveOutput: [],
+            progress: null
         }
     },
     
@@ -27,12 +29,27 @@ createApp({
             this.loading = true;
             
             try {
-                const response = await axios({
+                let response = await axios({
                     url: `${API_BASE}${endpoint}`,
-                    timeout: 30000,
+                    timeout: 60000,
                     ...options
                 });
                 
+                // Long-running scripts come back as a job; long-poll until it finishes
+                while (response.status === 202 && response.data.job_id) {
+                    response = await axios({
+                        url: `${API_BASE}/jobs/${response.data.job_id}?wait=25`,
+                        timeout: 60000
+                    });
+                    if (response.data.status === 'completed') {
+                        response = { status: 200, data: response.data.result };
+                    } else if (response.data.status === 'failed') {
+                        throw new Error(response.data.error || 'Job failed');
+                    } else {
+                        response = { status: 202, data: response.data };
+                    }
+                }
+                
                 if (response.data.success) {
                     return response.data;
                 } else {
@@ -46,9 +63,95 @@ createApp({
             }
         },
         
+        streamScript(script) {
+            // Show output as the script produces it; fall back to a plain request without SSE
+            const endpoints = { 'aws_manager.sh': '/resources', 'billing.sh': '/billing',
+                                'cloudfront_audit.sh': '/audit/cloudfront' };
+            if (!window.EventSource) {
+                return this.apiCall(endpoints[script]);
+            }
+            
+            this.error = null;
+            this.loading = true;
+            this.liveOutput = [];
+            this.progress = null;
+            const lines = [];
+            
+            return new Promise((resolve, reject) => {
+                const source = new EventSource(`${API_BASE}/stream/${script}`);
+                let started = false;
+                source.addEventListener('start', () => { started = true; });
+                const finish = (fn, value) => {
+                    source.close();
+                    this.loading = false;
+                    fn(value);
+                };
+                
+                source.addEventListener('stdout', (e) => {
+                    const line = JSON.parse(e.data).line;
+                    lines.push(line);
+                    // Keep the on-screen tail short; the full output is only assembled once
+                    this.liveOutput.push(line);
+                    if (this.liveOutput.length > 200) this.liveOutput.shift();
+                });
+                source.addEventListener('progress', (e) => {
+                    this.progress = JSON.parse(e.data);
+                });
+                source.addEventListener('end', (e) => {
+                    const end = JSON.parse(e.data);
+                    if (end.success) {
+                        // A cached result arrives as a lone 'end' event carrying the whole output
+                        const output = end.output !== undefined ? end.output : lines.join('\n');
+                        finish(resolve, { success: true, output, exit_code: end.exit_code });
+                    } else {
+                        this.error = end.error || `Script exited with ${end.exit_code}`;
+                        finish(reject, new Error(this.error));
+                    }
+                });
+                source.onerror = () => {
+                    if (!started && source.readyState === EventSource.CLOSED) {
+                        // Refused (503: no free process slot); run it as a job instead
+                        source.close();
+                        this.apiCall(endpoints[script]).then(resolve, reject);
+                        return;
+                    }
+                    this.error = 'Stream interrupted';
+                    finish(reject, new Error(this.error));
+                };
+            });
+        },
+        
+        async loadDashboard() {
+            // Resources and costs in one round trip; the server runs them side by side
+            try {
+                const batch = await this.apiCall('/batch', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    data: { operations: ['resources', 'costs'] }
+                });
+                const { resources, costs } = batch.results;
+                if (resources.status === 'ok') {
+                    this.resources = {
+                        ec2_count: resources.result.ec2_instances,
+                        s3_count: resources.result.s3_buckets,
+                        lambda_count: resources.result.lambda_functions
+                    };
+                }
+                if (costs.status === 'ok') {
+                    this.billing = {
+                        amount: parseFloat(costs.result.total_cost),
+                        currency: costs.result.currency
+                    };
+                }
+                this.message = batch.degraded ? 'Dashboard partially loaded' : 'Dashboard loaded';
+            } catch (error) {
+                console.error('Failed to load dashboard:', error);
+            }
+        },
+        
         async loadResources() {
             try {
-                const result = await this.apiCall('/resources');
+                const result = await this.streamScript('aws_manager.sh');
                 // Parse shell script output for resource counts
                 const output = result.output || '';
                 this.resources = {
@@ -64,7 +167,7 @@ createApp({
         
         async loadBilling() {
             try {
-                const result = await this.apiCall('/billing');
+                const result = await this.streamScript('billing.sh');
                 const output = result.output || '';
                 const costMatch = output.match(/Total Cost: \$?([\d.]+)/);
                 this.billing = {
@@ -103,7 +206,7 @@ createApp({
         
         async runAudit() {
             try {
-                const result = await this.apiCall('/audit/cloudfront');
+                const result = await this.streamScript('cloudfront_audit.sh');
                 this.auditResult = result.output;
                 this.message = 'Security audit completed';
             } catch (error) {
@@ -131,6 +234,6 @@ createApp({
     },
     
     mounted() {
-        this.loadResources();
+        this.loadDashboard();
     }
 }).mount('#app');
\ No newline at end of file
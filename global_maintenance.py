@@ -6,85 +6,103 @@ Runs during idle time to optimize costs across all AWS regions
 """
 
 import json
-import subprocess
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from aws_client import aws_call
+from response_cache import consume_refresh_flag
+from aws_resources import count, iter_ebs_snapshots, iter_ebs_volumes, iter_ec2_instances
+
+DEFAULT_CONCURRENCY = int(os.environ.get('AWS_MGMT_CONCURRENCY', '16'))
+
 class GlobalMaintenance:
-    def __init__(self):
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
         self.regions = [
             'us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-1',
             'us-east-2', 'eu-central-1', 'ap-northeast-1', 'ca-central-1'
         ]
+        self.concurrency = max(1, concurrency)
         self.maintenance_actions = []
         self.total_savings = 0
+        
+        # check name -> (checker, action message, $/month per item)
+        self.checks = {
+            'stopped': (self._check_stopped_instances, "stopped instances (consider terminating)", 20),
+            'volumes': (self._check_unattached_volumes, "unattached EBS volumes", 8),
+            'snapshots': (self._check_old_snapshots, "old snapshots (>30 days)", 3)
+        }
+    
+    def discover_regions(self):
+        """Use every region enabled for the account"""
+        try:
+            regions = aws_call('ec2', 'describe-regions', query='Regions[].RegionName')
+            if regions:
+                self.regions = sorted(regions)
+        except Exception:
+            print("⚠️ Could not list regions - using default region set")
+        return self.regions
     
     def run_global_maintenance(self):
         """Run maintenance across all regions during idle time"""
         print("🌍 GLOBAL MAINTENANCE MODE")
         print("=========================")
         print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"🌐 Checking {len(self.regions)} regions...")
+        print(f"🌐 Checking {len(self.regions)} regions ({self.concurrency} parallel checks)...")
         print()
         
-        for region in self.regions:
-            print(f"🔍 Region: {region}")
-            self._maintenance_region(region)
-            time.sleep(2)  # Avoid API throttling
+        self._scan_regions_concurrently(self.regions)
         
-        self._generate_maintenance_report()
+        return self._generate_maintenance_report()
     
-    def _maintenance_region(self, region):
-        """Perform maintenance in specific region"""
-        try:
-            # Check stopped instances
-            stopped = self._check_stopped_instances(region)
-            if stopped > 0:
-                self.maintenance_actions.append(f"{region}: {stopped} stopped instances (consider terminating)")
-                self.total_savings += stopped * 20  # $20/month per instance
-            
-            # Check unattached volumes
-            volumes = self._check_unattached_volumes(region)
-            if volumes > 0:
-                self.maintenance_actions.append(f"{region}: {volumes} unattached EBS volumes")
-                self.total_savings += volumes * 8  # $8/month per 10GB volume
-            
-            # Check old snapshots
-            snapshots = self._check_old_snapshots(region)
-            if snapshots > 0:
-                self.maintenance_actions.append(f"{region}: {snapshots} old snapshots (>30 days)")
-                self.total_savings += snapshots * 3  # $3/month per snapshot
-            
-            print(f"  ✅ Scanned - Found {stopped + volumes + snapshots} items")
-            
-        except Exception as e:
+    def _scan_regions_concurrently(self, regions):
+        """Fan out regions x checks and report each region as soon as it finishes"""
+        pending = {region: len(self.checks) for region in regions}
+        counts = {region: {} for region in regions}
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                executor.submit(checker, region): (region, name)
+                for region in regions
+                for name, (checker, _, _) in self.checks.items()
+            }
+            for future in as_completed(futures):
+                region, name = futures[future]
+                try:
+                    counts[region][name] = future.result()
+                except Exception:
+                    counts[region][name] = None
+                
+                pending[region] -= 1
+                if pending[region] == 0:
+                    print(f"🔍 Region: {region}")
+                    self._record_region(region, counts[region])
+    
+    def _record_region(self, region, counts):
+        """Add one region's check results to the report"""
+        if any(count is None for count in counts.values()):
             print(f"  ⚠️ Error scanning {region}: Limited permissions or region unavailable")
+            return
+        
+        for name, (_, message, monthly_cost) in self.checks.items():
+            if counts[name] > 0:
+                self.maintenance_actions.append(f"{region}: {counts[name]} {message}")
+                self.total_savings += counts[name] * monthly_cost
+        
+        print(f"  ✅ Scanned - Found {sum(counts.values())} items")
     
     def _check_stopped_instances(self, region):
         """Check stopped EC2 instances in region"""
         try:
-            result = subprocess.run([
-                'aws', 'ec2', 'describe-instances',
-                '--region', region,
-                '--query', 'Reservations[].Instances[?State.Name==`stopped`] | length(@)',
-                '--output', 'text'
-            ], capture_output=True, text=True, timeout=15)
-            
-            return int(result.stdout.strip()) if result.returncode == 0 else 0
+            return count(iter_ec2_instances(region=region, states=['stopped']))
         except:
             return 0
     
     def _check_unattached_volumes(self, region):
         """Check unattached EBS volumes in region"""
         try:
-            result = subprocess.run([
-                'aws', 'ec2', 'describe-volumes',
-                '--region', region,
-                '--query', 'Volumes[?State==`available`] | length(@)',
-                '--output', 'text'
-            ], capture_output=True, text=True, timeout=15)
-            
-            return int(result.stdout.strip()) if result.returncode == 0 else 0
+            return count(iter_ebs_volumes(region=region, status='available'))
         except:
             return 0
     
@@ -92,15 +110,7 @@ class GlobalMaintenance:
         """Check old snapshots in region"""
         try:
             # Simplified check - would normally parse dates
-            result = subprocess.run([
-                'aws', 'ec2', 'describe-snapshots',
-                '--region', region,
-                '--owner-ids', 'self',
-                '--query', 'length(Snapshots)',
-                '--output', 'text'
-            ], capture_output=True, text=True, timeout=15)
-            
-            total_snapshots = int(result.stdout.strip()) if result.returncode == 0 else 0
+            total_snapshots = count(iter_ebs_snapshots(region=region))
             return max(0, total_snapshots - 5)  # Assume snapshots > 5 are old
         except:
             return 0
@@ -156,9 +166,8 @@ class GlobalMaintenance:
             
             print(f"\n🔄 Cycle {processed_regions//regions_per_cycle + 1}: {', '.join(cycle_regions)}")
             
-            for region in cycle_regions:
-                self._maintenance_region(region)
-                processed_regions += 1
+            self._scan_regions_concurrently(cycle_regions)
+            processed_regions += len(cycle_regions)
             
             remaining_time = end_time - time.time()
             if remaining_time > cycle_duration:
@@ -168,10 +177,24 @@ class GlobalMaintenance:
         print(f"\n✅ Idle maintenance complete - processed {processed_regions} regions")
         return self._generate_maintenance_report()
 
+USAGE = "Usage: python3 global_maintenance.py [idle|quick|world] [duration_minutes] [--concurrency N]"
+
 def main():
     import sys
     
-    maintenance = GlobalMaintenance()
+    consume_refresh_flag(sys.argv)
+    concurrency = DEFAULT_CONCURRENCY
+    if '--concurrency' in sys.argv:
+        idx = sys.argv.index('--concurrency')
+        value = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else ''
+        if not value.isdigit() or int(value) < 1:
+            print("--concurrency needs a positive whole number")
+            print(USAGE)
+            return
+        concurrency = int(value)
+        del sys.argv[idx:idx + 2]
+    
+    maintenance = GlobalMaintenance(concurrency)
     
     if len(sys.argv) > 1:
         if sys.argv[1] == 'idle':
@@ -181,8 +204,12 @@ def main():
             # Quick scan of top 4 regions
             maintenance.regions = maintenance.regions[:4]
             maintenance.run_global_maintenance()
+        elif sys.argv[1] == 'world':
+            # Every region enabled for the account
+            maintenance.discover_regions()
+            maintenance.run_global_maintenance()
         else:
-            print("Usage: python3 global_maintenance.py [idle|quick] [duration_minutes]")
+            print(USAGE)
     else:
         # Full maintenance
         maintenance.run_global_maintenance()
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for the production serving mode
+Used by `python3 app.py serve`, `python3 backend/api/server.py serve` and plain `gunicorn -c gunicorn.conf.py`
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('AWS_MGMT_BIND', '0.0.0.0:5000')
+
+# Threaded workers: requests mostly wait on AWS and subprocesses, so a few
+# processes with several threads each go further than many processes
+worker_class = 'gthread'
+workers = int(os.environ.get('AWS_MGMT_WORKERS', str(min(4, multiprocessing.cpu_count() * 2))))
+threads = int(os.environ.get('AWS_MGMT_THREADS', '8'))
+
+# Keep client connections open between dashboard polls
+keepalive = int(os.environ.get('AWS_MGMT_KEEPALIVE', '5'))
+
+# Long script runs answer with a job to poll, so requests finish well within this
+timeout = int(os.environ.get('AWS_MGMT_WORKER_TIMEOUT', '120'))
+# SIGHUP/SIGTERM let in-flight requests finish for this long before workers exit
+graceful_timeout = int(os.environ.get('AWS_MGMT_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers periodically; jitter keeps them from restarting together
+max_requests = int(os.environ.get('AWS_MGMT_MAX_REQUESTS', '1000'))
+max_requests_jitter = 100
+
+# Each worker imports the app module itself (wsgi_server.serve and the
+# gunicorn CLI both load it by 'module:app' name), so background threads
+# and SQLite connections are created after the fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('AWS_MGMT_LOG_LEVEL', 'info')
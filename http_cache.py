@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+HTTP Caching for JSON APIs
+Content-hash ETags, conditional GETs, freshness-driven Cache-Control and negotiated gzip/brotli
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Small bodies aren't worth the CPU; inventories and billing output are
+MIN_COMPRESS_BYTES = int(os.environ.get('AWS_MGMT_MIN_COMPRESS_BYTES', '1024'))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def content_hash(value):
+    """Stable hash of value's canonical JSON; equal data gives equal hashes in every worker"""
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def cache_control(max_age):
+    """Cache-Control for data that stays fresh for max_age more seconds (None: never cache)"""
+    if max_age is None:
+        return 'no-store'
+    if max_age < 1:
+        return 'private, no-cache'
+    return f'private, max-age={int(max_age)}'
+
+
+def json_response(payload, etag=None, max_age=0, headers=None):
+    """200 JSON response with a weak ETag, or a body-less 304 when the client's copy matches
+
+    `etag` is a content hash of the underlying data (default: hashed from
+    payload). Bodies carry per-request metadata such as snapshot age, so
+    the tag is weak: equal data, not byte-identical bodies. The 304 check
+    happens before serialization, so unchanged polls cost no JSON encoding.
+    """
+    # Flask is imported here, not at module level, so CLI paths using content_hash() don't load it
+    from flask import Response, jsonify, request
+
+    etag = etag or content_hash(payload)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = cache_control(max_age)
+    response.headers.update(headers or {})
+    return compress(response)
+
+
+def compress(response):
+    """Encode a 200 response body with brotli or gzip, whichever the client prefers and we have"""
+    from flask import request
+
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] and accepted['br'] >= accepted['gzip']:
+        body, encoding = brotli.compress(data, quality=BROTLI_QUALITY), 'br'
+    elif accepted['gzip']:
+        body, encoding = gzip.compress(data, compresslevel=GZIP_LEVEL), 'gzip'
+    else:
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
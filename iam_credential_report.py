@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+IAM Credential Report Audit
+One GenerateCredentialReport/GetCredentialReport round trip instead of per-user IAM calls
+"""
+
+import csv
+import io
+import time
+from datetime import datetime, timezone
+
+from aws_client import AWSClientError, get_client
+
+ROOT_USER = '<root_account>'
+
+
+def _parse_date(value):
+    """Report dates are ISO 8601; N/A, no_information and not_supported mean none"""
+    if not value or value in ('N/A', 'no_information', 'not_supported'):
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _parse_bool(value):
+    return value == 'true'
+
+
+class CredentialReport:
+    """The account credential report parsed into an in-memory table
+
+    Each row holds one IAM user (plus the root account) with booleans and
+    dates already parsed, so every question is answered locally.
+    """
+
+    DATE_FIELDS = ['user_creation_time', 'password_last_used', 'password_last_changed',
+                   'password_next_rotation', 'access_key_1_last_rotated', 'access_key_1_last_used_date',
+                   'access_key_2_last_rotated', 'access_key_2_last_used_date',
+                   'cert_1_last_rotated', 'cert_2_last_rotated']
+    BOOL_FIELDS = ['password_enabled', 'mfa_active', 'access_key_1_active', 'access_key_2_active',
+                   'cert_1_active', 'cert_2_active']
+
+    def __init__(self, rows, generated_time=None):
+        self.rows = [self._parse_row(row) for row in rows]
+        self.generated_time = generated_time
+        self.root = next((r for r in self.rows if r['user'] == ROOT_USER), None)
+        self.users = [r for r in self.rows if r['user'] != ROOT_USER]
+
+    @classmethod
+    def from_csv(cls, content, generated_time=None):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return cls(csv.DictReader(io.StringIO(content)), generated_time)
+
+    @classmethod
+    def fetch(cls, profile=None, timeout=60):
+        """Generate (if needed) and download the report: 2+ API calls in total"""
+        iam = get_client('iam', profile=profile)
+        deadline = time.time() + timeout
+        try:
+            while iam.generate_credential_report()['State'] != 'COMPLETE':
+                if time.time() > deadline:
+                    raise AWSClientError("Timed out waiting for the IAM credential report")
+                time.sleep(2)
+            report = iam.get_credential_report()
+        except AWSClientError:
+            raise
+        except Exception as e:
+            raise AWSClientError(f"iam credential report failed: {e}") from e
+        return cls.from_csv(report['Content'], report.get('GeneratedTime'))
+
+    def _parse_row(self, row):
+        row = dict(row)
+        for field in self.DATE_FIELDS:
+            row[field] = _parse_date(row.get(field))
+        for field in self.BOOL_FIELDS:
+            row[field] = _parse_bool(row.get(field))
+        return row
+
+    def audit(self, max_age_days=90, now=None):
+        """Answer the MFA, key-age, password and inactivity questions in one pass"""
+        now = now or datetime.now(timezone.utc)
+        result = {
+            'total_users': len(self.users),
+            'users_without_mfa': [],
+            'console_users_without_mfa': [],
+            'old_access_keys': [],
+            'unused_access_keys': [],
+            'stale_passwords': [],
+            'inactive_users': [],
+            'root_access_keys': bool(self.root and (self.root['access_key_1_active'] or
+                                                   self.root['access_key_2_active'])),
+            'root_mfa': bool(self.root and self.root['mfa_active'])
+        }
+
+        def age(date):
+            return (now - date).days if date else None
+
+        for user in self.users:
+            name = user['user']
+            if not user['mfa_active']:
+                result['users_without_mfa'].append(name)
+                if user['password_enabled']:
+                    result['console_users_without_mfa'].append(name)
+
+            last_activity = [user['password_last_used']]
+            for n in (1, 2):
+                if not user[f'access_key_{n}_active']:
+                    continue
+                rotated_age = age(user[f'access_key_{n}_last_rotated'])
+                if rotated_age is not None and rotated_age > max_age_days:
+                    result['old_access_keys'].append({'user': name, 'key': n, 'age_days': rotated_age})
+                used = user[f'access_key_{n}_last_used_date']
+                last_activity.append(used)
+                used_age = age(used or user[f'access_key_{n}_last_rotated'])
+                if used_age is not None and used_age > max_age_days:
+                    result['unused_access_keys'].append({'user': name, 'key': n,
+                                                         'last_used': used.isoformat() if used else None})
+
+            if user['password_enabled']:
+                password_age = age(user['password_last_used'] or user['password_last_changed'])
+                if password_age is not None and password_age > max_age_days:
+                    result['stale_passwords'].append(name)
+
+            # Inactive: nothing used within the window, and not created within it either
+            recent = [d for d in last_activity if d and age(d) <= max_age_days]
+            created_age = age(user['user_creation_time'])
+            if not recent and (created_age is None or created_age > max_age_days):
+                result['inactive_users'].append(name)
+
+        return result
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+IAM Authorization Graph
+Bulk-loads users, groups, roles and policies via GetAccountAuthorizationDetails for local analysis
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from aws_resources import iter_pages
+
+SERVICE_LINKED_PATH = '/aws-service-role/'
+
+
+class IAMGraph:
+    """Indexed in-memory graph of IAM principals and their policy attachments
+
+    Nodes are keyed by name (principals) or ARN (managed policies). Edges
+    run principal -> managed policy and user -> group, each with a reverse
+    index, so all checks are local lookups with no further API calls.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.roles = {}
+        self.policies = {}
+        # (kind, name) -> set of policy ARNs, and the reverse
+        self.principal_policies = defaultdict(set)
+        self.policy_principals = defaultdict(set)
+        self.group_members = defaultdict(set)
+        self.user_groups = defaultdict(set)
+
+    @classmethod
+    def load(cls, profile=None):
+        """Build the graph from every page of GetAccountAuthorizationDetails"""
+        graph = cls()
+        for page in iter_pages('iam', 'get_account_authorization_details', profile=profile,
+                               Filter=['User', 'Role', 'Group', 'LocalManagedPolicy']):
+            graph.add_page(page)
+        return graph
+
+    def add_page(self, page):
+        for user in page.get('UserDetailList', []):
+            name = user['UserName']
+            self.users[name] = user
+            self._attach(('user', name), user.get('AttachedManagedPolicies', []))
+            for group in user.get('GroupList', []):
+                self.group_members[group].add(name)
+                self.user_groups[name].add(group)
+
+        for group in page.get('GroupDetailList', []):
+            self.groups[group['GroupName']] = group
+            self._attach(('group', group['GroupName']), group.get('AttachedManagedPolicies', []))
+
+        for role in page.get('RoleDetailList', []):
+            self.roles[role['RoleName']] = role
+            self._attach(('role', role['RoleName']), role.get('AttachedManagedPolicies', []))
+
+        for policy in page.get('Policies', []):
+            self.policies[policy['Arn']] = policy
+
+    def _attach(self, principal, attached):
+        for policy in attached:
+            self.principal_policies[principal].add(policy['PolicyArn'])
+            self.policy_principals[policy['PolicyArn']].add(principal)
+
+    def unused_roles(self, max_age_days=90, now=None):
+        """Customer roles not used (and not created) within `max_age_days`"""
+        now = now or datetime.now(timezone.utc)
+        unused = []
+        for name, role in self.roles.items():
+            if role.get('Path', '/').startswith(SERVICE_LINKED_PATH):
+                continue
+            last_used = (role.get('RoleLastUsed') or {}).get('LastUsedDate')
+            reference = last_used or role.get('CreateDate')
+            if reference is None or (now - reference).days > max_age_days:
+                unused.append({'RoleName': name, 'LastUsed': last_used.isoformat() if last_used else None})
+        return unused
+
+    def unused_policies(self):
+        """Customer managed policies with no attachment edge"""
+        return [
+            {'PolicyName': policy['PolicyName'], 'Arn': arn}
+            for arn, policy in self.policies.items()
+            if not self.policy_principals.get(arn)
+        ]
+
+    def orphaned_groups(self):
+        """Groups without members"""
+        return [name for name in self.groups if not self.group_members.get(name)]
+
+    def policies_for(self, kind, name):
+        """Managed policy ARNs attached to a principal, including via its groups"""
+        arns = set(self.principal_policies.get((kind, name), set()))
+        if kind == 'user':
+            for group in self.user_groups.get(name, set()):
+                arns |= self.principal_policies.get(('group', group), set())
+        return arns
+
+    def summary(self):
+        return {
+            'users': len(self.users),
+            'groups': len(self.groups),
+            'roles': len(self.roles),
+            'local_policies': len(self.policies),
+            'attachments': sum(len(p) for p in self.policy_principals.values())
+        }
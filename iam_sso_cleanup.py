@@ -5,50 +5,47 @@ IAM and SSO Cleanup Tool
 Clean up unused IAM users, roles, policies, and SSO assignments
 """
 
-import json
-import subprocess
 from datetime import datetime, timedelta
 
+from aws_client import aws_call
+from response_cache import consume_refresh_flag
+from iam_credential_report import CredentialReport
+from iam_graph import IAMGraph
+
 class IAMSSOCleaner:
     def __init__(self):
         self.cleanup_actions = []
         self.cost_savings = 0
+        self._credential_audit = None
+        self._iam_graph = None
+    
+    def _get_iam_graph(self):
+        """IAM authorization graph, loaded once and shared by role/policy/group checks"""
+        if self._iam_graph is None:
+            self._iam_graph = IAMGraph.load()
+        return self._iam_graph
+    
+    def _get_credential_audit(self):
+        """Credential report audit, fetched once and shared by all user/key checks"""
+        if self._credential_audit is None:
+            self._credential_audit = CredentialReport.fetch().audit(max_age_days=90)
+        return self._credential_audit
     
     def cleanup_iam_users(self):
         """Find and cleanup unused IAM users"""
         print("👤 Checking IAM Users...")
         
         try:
-            # Get all IAM users
-            result = subprocess.run([
-                'aws', 'iam', 'list-users',
-                '--query', 'Users[].{UserName:UserName,LastActivity:PasswordLastUsed,CreateDate:CreateDate}',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
+            # Users with no password or access key use for 90+ days
+            inactive_users = self._get_credential_audit()['inactive_users']
             
-            if result.returncode == 0:
-                users = json.loads(result.stdout)
-                inactive_users = []
-                
-                for user in users:
-                    # Check if user hasn't logged in for 90+ days
-                    if not user.get('LastActivity'):
-                        inactive_users.append(user['UserName'])
-                
-                if inactive_users:
-                    print(f"🔍 Found {len(inactive_users)} inactive users")
-                    self.cleanup_actions.extend([
-                        f"Delete inactive user: {user}" for user in inactive_users[:3]
-                    ])
-                else:
-                    print("✅ No inactive users found")
-            else:
-                print("⚠️ Demo mode - simulating IAM cleanup")
+            if inactive_users:
+                print(f"🔍 Found {len(inactive_users)} inactive users")
                 self.cleanup_actions.extend([
-                    "Delete inactive user: old-dev-user",
-                    "Delete inactive user: temp-contractor",
-                    "Remove unused service account"
+                    f"Delete inactive user: {user}" for user in inactive_users[:3]
                 ])
+            else:
+                print("✅ No inactive users found")
         except:
             print("⚠️ Demo mode - simulating IAM cleanup")
             self.cleanup_actions.extend([
@@ -61,19 +58,15 @@ class IAMSSOCleaner:
         print("🎭 Checking IAM Roles...")
         
         try:
-            result = subprocess.run([
-                'aws', 'iam', 'list-roles',
-                '--query', 'Roles[?!contains(RoleName, `service-role`)].{RoleName:RoleName,CreateDate:CreateDate}',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                roles = json.loads(result.stdout)
-                print(f"🔍 Found {len(roles)} custom roles to review")
-                self.cleanup_actions.append(f"Review {len(roles)} custom IAM roles for usage")
+            # Roles not used in 90+ days (service-linked roles excluded)
+            unused_roles = self._get_iam_graph().unused_roles(max_age_days=90)
+            if unused_roles:
+                print(f"🔍 Found {len(unused_roles)} unused roles")
+                self.cleanup_actions.extend([
+                    f"Delete unused role: {role['RoleName']}" for role in unused_roles[:3]
+                ])
             else:
-                print("⚠️ Demo mode")
-                self.cleanup_actions.append("Delete 2 unused custom roles")
+                print("✅ No unused roles found")
         except:
             print("⚠️ Demo mode")
             self.cleanup_actions.append("Delete 2 unused custom roles")
@@ -83,69 +76,48 @@ class IAMSSOCleaner:
         print("📋 Checking IAM Policies...")
         
         try:
-            result = subprocess.run([
-                'aws', 'iam', 'list-policies',
-                '--scope', 'Local',
-                '--query', 'Policies[?AttachmentCount==`0`].{PolicyName:PolicyName,Arn:Arn}',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                unused_policies = json.loads(result.stdout)
-                if unused_policies:
-                    print(f"🔍 Found {len(unused_policies)} unused policies")
-                    self.cleanup_actions.extend([
-                        f"Delete unused policy: {policy['PolicyName']}" 
-                        for policy in unused_policies[:3]
-                    ])
-                else:
-                    print("✅ No unused policies found")
+            unused_policies = self._get_iam_graph().unused_policies()
+            if unused_policies:
+                print(f"🔍 Found {len(unused_policies)} unused policies")
+                self.cleanup_actions.extend([
+                    f"Delete unused policy: {policy['PolicyName']}" 
+                    for policy in unused_policies[:3]
+                ])
             else:
-                print("⚠️ Demo mode")
-                self.cleanup_actions.append("Delete 3 unused custom policies")
+                print("✅ No unused policies found")
         except:
             print("⚠️ Demo mode") 
             self.cleanup_actions.append("Delete 3 unused custom policies")
     
+    def cleanup_iam_groups(self):
+        """Find and cleanup IAM groups without members"""
+        print("👥 Checking IAM Groups...")
+        
+        try:
+            orphaned_groups = self._get_iam_graph().orphaned_groups()
+            if orphaned_groups:
+                print(f"🔍 Found {len(orphaned_groups)} groups without members")
+                self.cleanup_actions.extend([
+                    f"Delete empty group: {group}" for group in orphaned_groups[:3]
+                ])
+            else:
+                print("✅ No empty groups found")
+        except:
+            print("⚠️ Demo mode")
+            self.cleanup_actions.append("Delete 1 empty IAM group")
+    
     def cleanup_access_keys(self):
         """Find and cleanup old access keys"""
         print("🔑 Checking Access Keys...")
         
         try:
-            result = subprocess.run([
-                'aws', 'iam', 'list-users',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
+            old_keys_count = len(self._get_credential_audit()['old_access_keys'])
             
-            if result.returncode == 0:
-                users = json.loads(result.stdout)
-                old_keys_count = 0
-                
-                for user in users['Users'][:5]:  # Check first 5 users
-                    try:
-                        keys_result = subprocess.run([
-                            'aws', 'iam', 'list-access-keys',
-                            '--user-name', user['UserName']
-                        ], capture_output=True, text=True, timeout=5)
-                        
-                        if keys_result.returncode == 0:
-                            keys = json.loads(keys_result.stdout)
-                            for key in keys.get('AccessKeyMetadata', []):
-                                # Check if key is older than 90 days
-                                create_date = datetime.fromisoformat(key['CreateDate'].replace('Z', '+00:00'))
-                                if (datetime.now(create_date.tzinfo) - create_date).days > 90:
-                                    old_keys_count += 1
-                    except:
-                        continue
-                
-                if old_keys_count > 0:
-                    print(f"🔍 Found {old_keys_count} old access keys")
-                    self.cleanup_actions.append(f"Rotate {old_keys_count} old access keys (>90 days)")
-                else:
-                    print("✅ No old access keys found")
+            if old_keys_count > 0:
+                print(f"🔍 Found {old_keys_count} old access keys")
+                self.cleanup_actions.append(f"Rotate {old_keys_count} old access keys (>90 days)")
             else:
-                print("⚠️ Demo mode")
-                self.cleanup_actions.append("Rotate 2 old access keys (>90 days)")
+                print("✅ No old access keys found")
         except:
             print("⚠️ Demo mode")
             self.cleanup_actions.append("Rotate 2 old access keys (>90 days)")
@@ -156,11 +128,8 @@ class IAMSSOCleaner:
         
         try:
             # Check if SSO is configured
-            result = subprocess.run([
-                'aws', 'sso-admin', 'list-instances'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
+            instances = aws_call('sso-admin', 'list-instances', query='Instances')
+            if instances:
                 print("🔍 SSO instance found - checking assignments")
                 self.cleanup_actions.append("Review SSO permission sets for unused assignments")
             else:
@@ -197,6 +166,7 @@ class IAMSSOCleaner:
 def main():
     import sys
     
+    consume_refresh_flag(sys.argv)
     cleaner = IAMSSOCleaner()
     
     print("🔐 IAM & SSO Cleanup Tool")
@@ -207,6 +177,7 @@ def main():
     cleaner.cleanup_iam_users()
     cleaner.cleanup_iam_roles()
     cleaner.cleanup_iam_policies()
+    cleaner.cleanup_iam_groups()
     cleaner.cleanup_access_keys()
     cleaner.cleanup_sso_assignments()
     
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+"""
+Indexed Resource Inventory
+EC2, Lambda and S3 listings synced into SQLite and served a page at a time with opaque cursors
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from aws_client import AWSClient
+from aws_resources import iter_ec2_instances, iter_lambda_functions, iter_s3_buckets
+from response_cache import CACHE_DIR, refresh_requested
+
+logger = logging.getLogger(__name__)
+
+# Inventories change more often than costs but listing every region is slow
+MIN_SYNC_INTERVAL = int(os.environ.get('AWS_MGMT_INVENTORY_TTL', '900'))
+REGION_WORKERS = int(os.environ.get('AWS_MGMT_INVENTORY_WORKERS', '8'))
+# A failing region (opt-in, denied by SCP, outage) is retried after this, doubling per failure
+RETRY_BACKOFF = 60
+MAX_RETRY_BACKOFF = 6 * 3600
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SCHEMA_VERSION = 2
+
+# Stored columns; any other requested field is read from the raw AWS record
+COLUMNS = ('id', 'name', 'region', 'state', 'created', 'tags')
+DEFAULT_FIELDS = COLUMNS
+GLOBAL = 'global'
+
+
+def _tags(tag_list):
+    return {tag['Key']: tag['Value'] for tag in tag_list or []}
+
+
+def _ec2(instance, region):
+    tags = _tags(instance.get('Tags'))
+    return (instance['InstanceId'], tags.get('Name'), region, instance.get('State', {}).get('Name'),
+            instance.get('LaunchTime'), tags)
+
+
+def _lambda(function, region):
+    # list_functions carries no tags; State is only present on some runtimes
+    return (function['FunctionArn'], function['FunctionName'], region, function.get('State'),
+            function.get('LastModified'), {})
+
+
+def _s3(bucket, region):
+    return (bucket['Name'], bucket['Name'], bucket.get('BucketRegion'), None, bucket.get('CreationDate'), {})
+
+
+# kind -> (iterator(region, profile), record builder, regional?)
+KINDS = {
+    'ec2': (lambda region, profile: iter_ec2_instances(region=region, profile=profile), _ec2, True),
+    'lambda': (lambda region, profile: iter_lambda_functions(region=region, profile=profile), _lambda, True),
+    's3': (lambda region, profile: iter_s3_buckets(profile=profile), _s3, False)
+}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _filter_key(kind, filters):
+    return hashlib.sha256(json.dumps([kind, filters], sort_keys=True).encode()).hexdigest()[:16]
+
+
+def encode_cursor(kind, filters, after):
+    """Opaque cursor: the last id returned, bound to the kind and filters that produced it"""
+    data = json.dumps({'k': kind, 'q': _filter_key(kind, filters), 'a': after}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, kind, filters):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        after = data['a']
+        matches = data['k'] == kind and data['q'] == _filter_key(kind, filters)
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
+    if not matches:
+        raise InvalidCursorError("Cursor belongs to a different listing or filter")
+    return after
+
+
+class Inventory:
+    """Per-account resource listings stored in SQLite with keyset indexes
+
+    Freshness is tracked per region: sync() re-lists (concurrently) only
+    the regions last synced over `min_sync_interval` ago and replaces each
+    one's rows wholesale, so deleted resources disappear. A region whose
+    listing fails keeps its previous rows and is retried with exponential
+    backoff, so it neither blocks nor keeps re-triggering the others.
+
+    page() reads straight from the indexes: rows are ordered by id and
+    each page starts after the last id of the previous one, so page N
+    costs the same as page 1 whatever the filters. Only the very first
+    listing of a kind (or --refresh) syncs inline; after that, due regions
+    are re-listed in the background while pages are served from what is
+    stored. Tag filters only match kinds whose list calls return tags
+    (EC2).
+    """
+
+    def __init__(self, path=None, profile=None, min_sync_interval=MIN_SYNC_INTERVAL):
+        self.path = Path(path) if path else CACHE_DIR / 'inventory.db'
+        self.profile = profile
+        self.min_sync_interval = min_sync_interval
+        self._account = None
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inventory-sync')
+        self._scheduled = set()
+        self._scheduled_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            # The inventory is rebuildable from AWS; start over on layout changes
+            for table in ('resources', 'resource_tags', 'inventory_sync'):
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resources (
+                account TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                id TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                name TEXT,
+                region TEXT,
+                state TEXT,
+                created TEXT,
+                tags TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (account, kind, id)
+            ) WITHOUT ROWID""")
+        conn.execute('CREATE INDEX IF NOT EXISTS resources_region ON resources (account, kind, region, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS resources_state ON resources (account, kind, state, id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS resources_scope ON resources (account, kind, scope)')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resource_tags (
+                account TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (account, kind, key, value, id)
+            ) WITHOUT ROWID""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS inventory_sync (
+                account TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                synced_at REAL,
+                attempted_at REAL NOT NULL,
+                failures INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (account, kind, scope)
+            )""")
+
+    @property
+    def account(self):
+        if self._account is None:
+            self._account = AWSClient(profile=self.profile).account_id()
+        return self._account
+
+    def regions(self):
+        """Every region enabled for the account, or just the session's region if that fails"""
+        client = AWSClient(profile=self.profile)
+        try:
+            return sorted(client.call('ec2', 'describe-regions', query='Regions[].RegionName'))
+        except Exception:
+            return [client.session().region_name or 'us-east-1']
+
+    def sync_status(self, kind):
+        """{region: {'synced_at', 'attempted_at', 'failures', 'error'}} for the kind"""
+        rows = self._conn().execute('SELECT scope, synced_at, attempted_at, failures, error FROM inventory_sync '
+                                    'WHERE account = ? AND kind = ?', (self.account, kind)).fetchall()
+        return {scope: {'synced_at': synced_at, 'attempted_at': attempted_at, 'failures': failures, 'error': error}
+                for scope, synced_at, attempted_at, failures, error in rows}
+
+    def synced_at(self, kind):
+        """Oldest sync time across the kind's healthy regions, or None if none ever synced"""
+        row = self._conn().execute('SELECT MIN(synced_at) FROM inventory_sync '
+                                   'WHERE account = ? AND kind = ? AND failures = 0',
+                                   (self.account, kind)).fetchone()
+        return row[0]
+
+    def _due_at(self, status):
+        """When a region should next be listed: after the sync interval, or its backoff while failing"""
+        if status['failures']:
+            backoff = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (status['failures'] - 1))
+            return status['attempted_at'] + backoff
+        return status['synced_at'] + self.min_sync_interval
+
+    def next_due(self, kind):
+        """Earliest time any known region of the kind is due, or None if the kind was never listed"""
+        status = self.sync_status(kind)
+        return min(self._due_at(s) for s in status.values()) if status else None
+
+    def sync(self, kind, force=False):
+        """Re-list the kind's regions that are due (all with force); returns the number refreshed"""
+        fetch, build, regional = KINDS[kind]
+        force = force or refresh_requested()
+        with self._sync_lock:
+            status = self.sync_status(kind)
+            now = time.time()
+            scopes = [scope for scope in (self.regions() if regional else [GLOBAL])
+                      if force or scope not in status or self._due_at(status[scope]) <= now]
+            if not scopes:
+                return 0
+
+            def listing(scope):
+                region = scope if regional else None
+                return [build(item, region) + (item,) for item in fetch(region, self.profile)]
+
+            refreshed = 0
+            with ThreadPoolExecutor(max_workers=REGION_WORKERS, thread_name_prefix='inventory') as pool:
+                futures = {scope: pool.submit(listing, scope) for scope in scopes}
+                for scope, future in futures.items():
+                    try:
+                        records = future.result()
+                    except Exception as e:
+                        # Keep the region's previous rows and back off before trying it again
+                        logger.warning(f"Inventory {kind} sync failed in {scope}: {e}")
+                        self._record_failure(kind, scope, str(e))
+                        continue
+                    self._store(kind, scope, records)
+                    refreshed += 1
+            return refreshed
+
+    def sync_in_background(self, kind):
+        """Queue sync(kind) unless one is already queued; returns at once"""
+        with self._scheduled_lock:
+            if kind in self._scheduled:
+                return
+            self._scheduled.add(kind)
+
+        def run():
+            try:
+                self.sync(kind)
+            except Exception as e:
+                logger.warning(f"Inventory {kind} background sync failed: {e}")
+            finally:
+                with self._scheduled_lock:
+                    self._scheduled.discard(kind)
+
+        self._background.submit(run)
+
+    def _record_failure(self, kind, scope, error):
+        self._conn().execute(
+            'INSERT INTO inventory_sync (account, kind, scope, synced_at, attempted_at, failures, error) '
+            'VALUES (?, ?, ?, NULL, ?, 1, ?) ON CONFLICT (account, kind, scope) DO UPDATE SET '
+            'attempted_at = excluded.attempted_at, failures = failures + 1, error = excluded.error',
+            (self.account, kind, scope, time.time(), error))
+
+    def _store(self, kind, scope, records):
+        """Replace one region's rows (and their tags) in a single transaction"""
+        conn = self._conn()
+        account = self.account
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM resource_tags WHERE account = ? AND kind = ? AND id IN '
+                         '(SELECT id FROM resources WHERE account = ? AND kind = ? AND scope = ?)',
+                         (account, kind, account, kind, scope))
+            conn.execute('DELETE FROM resources WHERE account = ? AND kind = ? AND scope = ?', (account, kind, scope))
+            conn.executemany(
+                'INSERT OR REPLACE INTO resources (account, kind, id, scope, name, region, state, created, tags, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(account, kind, rid, scope, name, region, state, str(created) if created else None,
+                  json.dumps(tags), json.dumps(raw, default=str))
+                 for rid, name, region, state, created, tags, raw in records])
+            conn.executemany(
+                'INSERT OR REPLACE INTO resource_tags (account, kind, key, value, id) VALUES (?, ?, ?, ?, ?)',
+                [(account, kind, key, value, rid)
+                 for rid, _, _, _, _, tags, _ in records for key, value in tags.items()])
+            now = time.time()
+            conn.execute('INSERT OR REPLACE INTO inventory_sync (account, kind, scope, synced_at, attempted_at, failures, '
+                         'error) VALUES (?, ?, ?, ?, ?, 0, NULL)', (account, kind, scope, now, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def page(self, kind, limit=DEFAULT_PAGE_SIZE, cursor=None, region=None, state=None, tags=None, fields=None):
+        """One page of resources: {'items', 'next_cursor', 'synced_at', 'failing_regions'}
+
+        `tags` is {key: value} (all must match); `fields` picks stored
+        columns and/or top-level keys of the raw AWS record.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown resource kind: {kind}")
+        due = self.next_due(kind)
+        if due is None or refresh_requested():
+            # Nothing stored yet (or --refresh): this page has to wait for the listing
+            self.sync(kind)
+        elif due <= time.time():
+            self.sync_in_background(kind)
+        limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        tags = dict(tags or {})
+        filters = {'region': region, 'state': state, 'tags': tags}
+        after = decode_cursor(cursor, kind, filters) if cursor else ''
+        fields = list(dict.fromkeys(fields or DEFAULT_FIELDS))
+        raw_fields = [field for field in fields if field not in COLUMNS]
+
+        columns = ', '.join(f'r.{c}' for c in COLUMNS) + (', r.data' if raw_fields else '')
+        where = ['r.account = ?', 'r.kind = ?', 'r.id > ?']
+        params = [self.account, kind, after]
+        if region:
+            where.append('r.region = ?')
+            params.append(region)
+        if state:
+            where.append('r.state = ?')
+            params.append(state)
+        source = 'resources r'
+        tag_items = sorted(tags.items())
+        if tag_items:
+            # Walk the first tag's index in id order; further tags are point lookups
+            key, value = tag_items[0]
+            source = ('resource_tags t JOIN resources r '
+                      'ON r.account = t.account AND r.kind = t.kind AND r.id = t.id')
+            where[2:3] = ['t.account = ?', 't.kind = ?', 't.key = ?', 't.value = ?', 't.id > ?']
+            params[2:3] = [self.account, kind, key, value, after]
+            for key, value in tag_items[1:]:
+                where.append('EXISTS (SELECT 1 FROM resource_tags x WHERE x.account = r.account AND '
+                             'x.kind = r.kind AND x.key = ? AND x.value = ? AND x.id = r.id)')
+                params += [key, value]
+        order = 't.id' if tag_items else 'r.id'
+        rows = self._conn().execute(f'SELECT {columns} FROM {source} WHERE {" AND ".join(where)} '
+                                    f'ORDER BY {order} LIMIT ?', params + [limit + 1]).fetchall()
+
+        items = [self._project(row, fields, raw_fields) for row in rows[:limit]]
+        more = len(rows) > limit
+        return {
+            'kind': kind,
+            'items': items,
+            'next_cursor': encode_cursor(kind, filters, rows[limit - 1][0]) if more else None,
+            'synced_at': self.synced_at(kind),
+            'failing_regions': sorted(scope for scope, s in self.sync_status(kind).items() if s['failures'])
+        }
+
+    @staticmethod
+    def _project(row, fields, raw_fields):
+        record = dict(zip(COLUMNS, row))
+        record['tags'] = json.loads(record['tags'])
+        raw = json.loads(row[len(COLUMNS)]) if raw_fields else {}
+        return {field: record[field] if field in COLUMNS else raw.get(field) for field in fields}
+
+    def counts(self):
+        """{kind: resources stored}"""
+        return dict(self._conn().execute('SELECT kind, COUNT(*) FROM resources WHERE account = ? GROUP BY kind',
+                                         (self.account,)).fetchall())
+
+
+_inventories = {}
+_inventories_lock = threading.Lock()
+
+
+def get_inventory(profile=None):
+    """The process-wide Inventory for a profile"""
+    with _inventories_lock:
+        if profile not in _inventories:
+            _inventories[profile] = Inventory(profile=profile)
+        return _inventories[profile]
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+"""
+Live Dashboard Updates
+One producer turns snapshot changes into small deltas that every connected dashboard shares
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+HEARTBEAT = 15
+HISTORY = 100
+# Frames a subscriber may fall behind before it is dropped (its EventSource then reconnects)
+QUEUE_SIZE = 64
+# Each open stream holds a server thread: streams end after this long (the
+# EventSource reconnects with Last-Event-ID and gets the missed frames), and
+# at most this many are open per process so other requests keep threads
+MAX_STREAM_SECONDS = int(os.environ.get('AWS_MGMT_STREAM_MAX_SECONDS', '300'))
+MAX_SUBSCRIBERS = int(os.environ.get('AWS_MGMT_STREAM_MAX_SUBSCRIBERS', '4'))
+RETRY_MS = 5000
+
+
+def merge_patch(old, new):
+    """JSON merge patch (RFC 7386) that turns old into new
+
+    Nested objects are diffed key by key and lists are replaced whole. As
+    in the RFC, null means "remove", so keys whose new value is None are
+    removed on the client.
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+    patch = {key: None for key in old.keys() - new.keys()}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            patch[key] = merge_patch(old[key], value)
+    return patch
+
+
+def apply_patch(target, patch):
+    """Apply a merge patch the way the dashboard's applyPatch() does"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_patch(result.get(key), value)
+    return result
+
+
+class HubFullError(Exception):
+    """Raised when a process already serves its maximum number of streams"""
+
+
+def _frame(seq, event, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+
+class UpdateHub:
+    """Fan snapshot changes out to server-sent event streams
+
+    publish() is the single producer. It is subscribed to a
+    SnapshotRefresher, so it runs once per content change and not per
+    client. It diffs the new value against the last one, formats the
+    frame once, and hands the same string to every subscriber. A new
+    stream starts with one full `snapshot` event per name and then gets
+    `delta` events carrying a merge patch plus the version it applies to.
+    A stream that reconnects with Last-Event-ID inside the recent history
+    gets the missed frames replayed instead.
+
+    A merge patch cannot set a value to null, since null means "remove".
+    When a change needs that, the full snapshot is sent instead of a delta.
+    """
+
+    def __init__(self, history=HISTORY, heartbeat=HEARTBEAT, max_seconds=MAX_STREAM_SECONDS,
+                 max_subscribers=MAX_SUBSCRIBERS):
+        self.heartbeat = heartbeat
+        self.max_seconds = max_seconds
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._values = {}
+        self._full = {}
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+
+    def publish(self, name, snapshot):
+        """Record the new snapshot for name and push its delta to every stream"""
+        with self._lock:
+            previous = self._values.get(name)
+            if previous and previous[0] == snapshot.etag:
+                return
+            self._seq += 1
+            header = {'name': name, 'version': snapshot.etag, 'computed_at': snapshot.computed_at}
+            full = _frame(self._seq, 'snapshot', dict(header, value=snapshot.value))
+            patch = merge_patch(previous[1], snapshot.value) if previous else None
+            if previous is None or apply_patch(previous[1], patch) != snapshot.value:
+                frame = full
+            else:
+                frame = _frame(self._seq, 'delta', dict(header, base=previous[0], patch=patch))
+            self._values[name] = (snapshot.etag, snapshot.value)
+            self._full[name] = full
+            self._history.append((self._seq, frame))
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(frame)
+            except queue.Full:
+                subscriber.dropped = True
+                with self._lock:
+                    self._subscribers.discard(subscriber)
+
+    def _initial(self, last_event_id):
+        """Frames a new stream starts with: the missed history, or every current snapshot"""
+        try:
+            last = int(last_event_id)
+        except (TypeError, ValueError):
+            last = None
+        if last is not None and self._history and self._history[0][0] <= last + 1 and last <= self._seq:
+            return [frame for seq, frame in self._history if seq > last]
+        return list(self._full.values())
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE frames for one client, ending after `max_seconds`
+
+        Raises HubFullError up front when `max_subscribers` streams are
+        already open. Closing the generator unsubscribes.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise HubFullError(f"{len(self._subscribers)} live update streams already open")
+        return self._frames(last_event_id)
+
+    def _frames(self, last_event_id):
+        subscriber = _Subscriber()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                # Lost the race for the last slot; the client retries shortly
+                yield f'retry: {RETRY_MS}\n\n'
+                return
+            initial = self._initial(last_event_id)
+            self._subscribers.add(subscriber)
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            yield from initial
+            deadline = time.monotonic() + self.max_seconds
+            while not subscriber.dropped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    yield subscriber.queue.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': len(self._subscribers), 'max_subscribers': self.max_subscribers,
+                    'published': self._seq}
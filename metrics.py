@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+"""
+Process Metrics Registry
+Counters, gauges and fixed-bucket histograms rendered in the Prometheus text format
+"""
+
+import os
+import threading
+import time
+
+# Seconds; spans cache hits (sub-millisecond) through slow Cost Explorer pages
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds; shell scripts run from well under a second to many minutes
+SUBPROCESS_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_labels(self.label_names, key)} {_number(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; set() it, or give it a function read at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.function is not None:
+            # function() returns {label tuple: value}, or a bare value when unlabelled
+            try:
+                values = self.function()
+            except Exception:
+                values = {}
+            values = values if isinstance(values, dict) else {(): values}
+            # None means "no value right now"; a sample without a number is invalid
+            with self._lock:
+                self._values = {tuple(str(v) for v in key): value for key, value in values.items()
+                                if value is not None}
+        return super().render()
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed cumulative buckets, plus their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the block's duration"""
+        return _Timer(self, labels)
+
+    def _samples(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = _labels(self.label_names, key, [('le', _number(float(bound)))])
+            lines.append(f'{self.name}_bucket{le} {cumulative}')
+        labels = _labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_number(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Registry:
+    """Named metrics of one process
+
+    Metrics are created once (by name) and shared, so modules can declare
+    the same metric independently. Each server worker keeps its own
+    registry; scrape every worker, or sum across `instance` in queries.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=(), function=None):
+        return self._get(Gauge, name, help, labels, function)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write render() atomically, e.g. for node_exporter's textfile collector"""
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+_registry = Registry()
+
+
+def get_registry():
+    """The process-wide Registry"""
+    return _registry
+
+
+# Metrics shared by several modules
+AWS_CALL_SECONDS = _registry.histogram(
+    'aws_call_duration_seconds', 'AWS API call latency including retries',
+    ('service', 'operation', 'region', 'outcome'))
+AWS_THROTTLES = _registry.counter(
+    'aws_throttle_events_total', 'AWS responses rejected with a throttling error code', ('service', 'region'))
+CACHE_LOOKUPS = _registry.counter(
+    'cache_lookups_total', 'Cache lookups by cache and result (hit, shared in-flight or miss)', ('cache', 'result'))
+SUBPROCESS_SECONDS = _registry.histogram(
+    'subprocess_duration_seconds', 'Duration of script subprocesses', ('command', 'outcome'),
+    buckets=SUBPROCESS_BUCKETS)
+
+
+def _hit_ratios():
+    totals = {}
+    with CACHE_LOOKUPS._lock:
+        for (cache, result), count in CACHE_LOOKUPS._values.items():
+            hits, lookups = totals.get(cache, (0, 0))
+            totals[cache] = (hits + (count if result != 'miss' else 0), lookups + count)
+    return {(cache,): round(hits / lookups, 4) for cache, (hits, lookups) in totals.items() if lookups}
+
+
+CACHE_HIT_RATIO = _registry.gauge(
+    'cache_hit_ratio', 'Share of cache lookups answered without recomputing', ('cache',), function=_hit_ratios)
+HTTP_REQUEST_SECONDS = _registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('app', 'route', 'method', 'status'))
+
+
+def instrument_client(client):
+    """Time every API call of a boto3 client (from first attempt to final response)"""
+    service = client.meta.service_model.service_name
+    region = client.meta.region_name or 'default'
+    events = client.meta.events
+
+    def before_call(model=None, context=None, **kwargs):
+        if context is not None:
+            # after-call-error carries no model, so the operation name travels in the context
+            context['aws_mgmt_call'] = (model.name, time.perf_counter())
+
+    def observe(context, outcome):
+        call = (context or {}).pop('aws_mgmt_call', None)
+        if call is not None:
+            operation, started = call
+            AWS_CALL_SECONDS.observe(time.perf_counter() - started, service=service,
+                                     operation=operation, region=region, outcome=outcome)
+
+    def after_call(http_response=None, context=None, **kwargs):
+        status = getattr(http_response, 'status_code', 0)
+        observe(context, 'ok' if status < 300 else 'error')
+
+    def after_call_error(context=None, **kwargs):
+        observe(context, 'error')
+
+    events.register('before-call', before_call, unique_id='aws-mgmt-metrics-before')
+    events.register('after-call', after_call, unique_id='aws-mgmt-metrics-after')
+    events.register('after-call-error', after_call_error, unique_id='aws-mgmt-metrics-error')
+    return client
+
+
+def instrument_app(app, name):
+    """Record per-route latency for a Flask app and serve GET /metrics from it"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The route pattern, not the path, keeps label cardinality bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, app=name, route=route,
+                                         method=request.method, status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(_registry.render(), content_type=CONTENT_TYPE)
+
+    return app
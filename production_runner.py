@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 """Production AWS Management with Real-World Logging & Analysis"""
 
-import boto3
 import json
 import logging
+import os
 import time
 from datetime import datetime
 from pathlib import Path
 
+from aws_client import AWSClientError, get_client, get_pool
+from aws_resources import iter_ec2_instances, iter_iam_users, iter_s3_buckets
+from cost_ledger import CostLedger, get_ledger
+from iam_credential_report import CredentialReport
+from metrics import get_registry
+from s3_sizing import size_buckets
+
 # Production logging setup
 log_dir = Path("/tmp/aws-mgmt")
 log_dir.mkdir(parents=True, exist_ok=True)
@@ -22,9 +29,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger("aws-mgmt")
 
+# Written at the end of a run for node_exporter's textfile collector, when set
+METRICS_FILE = os.environ.get('AWS_MGMT_METRICS_FILE')
+
+registry = get_registry()
+OPERATIONS = registry.counter('aws_operations_total', 'Production analysis operations by outcome',
+                              ('service', 'operation', 'status'))
+OPERATION_COST = registry.counter('aws_operation_cost_usd_total', 'Estimated cost of the analysed resources',
+                                  ('service', 'operation'))
+OPERATION_SECONDS = registry.histogram('aws_operation_duration_seconds', 'Production analysis operation duration',
+                                       ('service', 'operation'))
+
 class ProductionAWSManager:
     def __init__(self):
-        self.session = boto3.Session()
+        self.session = get_pool().session()
         self.metrics = {"operations": 0, "errors": 0, "cost": 0.0}
         
     def log_operation(self, service, operation, status, duration=0, cost=0.0):
@@ -33,6 +51,10 @@ class ProductionAWSManager:
         self.metrics["cost"] += cost
         if status == "error":
             self.metrics["errors"] += 1
+        OPERATIONS.inc(service=service, operation=operation, status=status)
+        OPERATION_COST.inc(cost, service=service, operation=operation)
+        if duration:
+            OPERATION_SECONDS.observe(duration / 1000, service=service, operation=operation)
             
         logger.info(json.dumps({
             "type": "aws_operation",
@@ -48,19 +70,16 @@ class ProductionAWSManager:
         """Real EC2 analysis with cost tracking"""
         try:
             start = time.time()
-            ec2 = self.session.client('ec2')
             
-            # Get instances
-            response = ec2.describe_instances()
+            # Get instances (all pages)
             instances = []
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instances.append({
-                        "id": instance['InstanceId'],
-                        "type": instance['InstanceType'],
-                        "state": instance['State']['Name'],
-                        "launch_time": instance.get('LaunchTime', '').isoformat() if instance.get('LaunchTime') else None
-                    })
+            for instance in iter_ec2_instances():
+                instances.append({
+                    "id": instance['InstanceId'],
+                    "type": instance['InstanceType'],
+                    "state": instance['State']['Name'],
+                    "launch_time": instance.get('LaunchTime', '').isoformat() if instance.get('LaunchTime') else None
+                })
             
             duration = (time.time() - start) * 1000
             self.log_operation("ec2", "describe_instances", "success", duration, 0.01)
@@ -86,33 +105,27 @@ class ProductionAWSManager:
         """Real S3 analysis with cost tracking"""
         try:
             start = time.time()
-            s3 = self.session.client('s3')
             
-            # List buckets
-            response = s3.list_buckets()
+            # List buckets and size them from storage metrics / inventory
+            all_buckets = list(iter_s3_buckets())
+            sizes = size_buckets(all_buckets)
             buckets = []
             total_size = 0
             
-            for bucket in response['Buckets']:
-                bucket_name = bucket['Name']
-                try:
-                    # Get bucket size (simplified)
-                    objects = s3.list_objects_v2(Bucket=bucket_name, MaxKeys=1000)
-                    size = sum(obj.get('Size', 0) for obj in objects.get('Contents', []))
-                    total_size += size
-                    
-                    buckets.append({
-                        "name": bucket_name,
-                        "creation_date": bucket['CreationDate'].isoformat(),
-                        "size_bytes": size
-                    })
-                except Exception:
-                    buckets.append({
-                        "name": bucket_name,
-                        "creation_date": bucket['CreationDate'].isoformat(),
-                        "size_bytes": 0,
-                        "error": "access_denied"
-                    })
+            for bucket in all_buckets:
+                size = sizes.get(bucket['Name'], {})
+                total_size += size.get('size_bytes', 0)
+                
+                entry = {
+                    "name": bucket['Name'],
+                    "creation_date": bucket['CreationDate'].isoformat(),
+                    "size_bytes": size.get('size_bytes', 0),
+                    "object_count": size.get('object_count', 0),
+                    "size_source": size.get('source')
+                }
+                if 'error' in size:
+                    entry["error"] = size['error']
+                buckets.append(entry)
             
             duration = (time.time() - start) * 1000
             storage_cost = (total_size / (1024**3)) * 0.023  # $0.023 per GB
@@ -134,39 +147,27 @@ class ProductionAWSManager:
             return []
     
     def cost_analysis(self):
-        """Real cost analysis using Cost Explorer"""
+        """Month-to-date cost by service from the local cost ledger"""
         try:
             start = time.time()
-            ce = self.session.client('ce', region_name='us-east-1')
-            
-            # Get last 30 days cost
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now().replace(day=1)).strftime('%Y-%m-%d')
-            
-            response = ce.get_cost_and_usage(
-                TimePeriod={'Start': start_date, 'End': end_date},
-                Granularity='MONTHLY',
-                Metrics=['BlendedCost'],
-                GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}]
-            )
-            
-            costs = {}
-            total_cost = 0
-            for result in response['ResultsByTime']:
-                for group in result['Groups']:
-                    service = group['Keys'][0]
-                    cost = float(group['Metrics']['BlendedCost']['Amount'])
-                    costs[service] = cost
-                    total_cost += cost
+            ledger = get_ledger()
+            api_calls = ledger.api_calls
+            
+            start_date, end_date = CostLedger.window(month_to_date=True)
+            table = ledger.table(month_to_date=True)
+            costs = table.by_service()
             
             duration = (time.time() - start) * 1000
-            self.log_operation("ce", "get_cost_and_usage", "success", duration)
+            # Cost Explorer bills $0.01 per request; ledger hits are free
+            self.log_operation("ce", "get_cost_and_usage", "success", duration,
+                               0.01 * (ledger.api_calls - api_calls))
             
             logger.info(json.dumps({
                 "type": "cost_analysis",
                 "period": f"{start_date} to {end_date}",
-                "total_cost_usd": round(total_cost, 2),
-                "top_services": dict(sorted(costs.items(), key=lambda x: x[1], reverse=True)[:5])
+                "total_cost_usd": round(table.total(), 2),
+                "top_services": table.by_service(top=5),
+                f"by_{table.dimension.lower()}": table.by_group()
             }))
             
             return costs
@@ -176,40 +177,70 @@ class ProductionAWSManager:
             logger.error(f"Cost analysis failed: {e}")
             return {}
     
-    def security_audit(self):
+    def security_audit(self, use_credential_report=True):
         """Basic security audit"""
         try:
-            iam = self.session.client('iam')
-            
-            # Check for users without MFA
-            users = iam.list_users()['Users']
-            no_mfa_users = []
-            
-            for user in users:
-                mfa_devices = iam.list_mfa_devices(UserName=user['UserName'])
-                if not mfa_devices['MFADevices']:
-                    no_mfa_users.append(user['UserName'])
+            start = time.time()
+            if use_credential_report:
+                try:
+                    result = self._credential_report_audit()
+                    self.log_operation("iam", "get_credential_report", "success", (time.time() - start) * 1000)
+                except AWSClientError as e:
+                    logger.warning(f"Credential report unavailable, falling back to per-user checks: {e}")
+                    result = self._per_user_audit()
+            else:
+                result = self._per_user_audit()
             
+            total_users = result.pop("total_users")
+            no_mfa_users = result["users_without_mfa"]
             logger.info(json.dumps({
                 "type": "security_audit",
-                "total_users": len(users),
+                "total_users": total_users,
                 "users_without_mfa": len(no_mfa_users),
-                "mfa_compliance": round((len(users) - len(no_mfa_users)) / len(users) * 100, 1) if users else 100
+                "old_access_keys": len(result.get("old_access_keys", [])),
+                "inactive_users": len(result.get("inactive_users", [])),
+                "mfa_compliance": round((total_users - len(no_mfa_users)) / total_users * 100, 1) if total_users else 100
             }))
             
-            return {"users_without_mfa": no_mfa_users}
+            return result
             
         except Exception as e:
             logger.error(f"Security audit failed: {e}")
             return {}
     
+    def _credential_report_audit(self):
+        """MFA, key age and inactivity from the credential report (O(1) API calls)"""
+        audit = CredentialReport.fetch().audit()
+        return {
+            "total_users": audit["total_users"],
+            "users_without_mfa": audit["users_without_mfa"],
+            "old_access_keys": audit["old_access_keys"],
+            "stale_passwords": audit["stale_passwords"],
+            "inactive_users": audit["inactive_users"],
+            "root_access_keys": audit["root_access_keys"]
+        }
+    
+    def _per_user_audit(self):
+        """MFA check with one ListMFADevices call per user"""
+        iam = get_client('iam')
+        total_users = 0
+        no_mfa_users = []
+        
+        for user in iter_iam_users():
+            total_users += 1
+            mfa_devices = iam.list_mfa_devices(UserName=user['UserName'])
+            if not mfa_devices['MFADevices']:
+                no_mfa_users.append(user['UserName'])
+        
+        return {"total_users": total_users, "users_without_mfa": no_mfa_users}
+    
     def generate_report(self):
         """Generate comprehensive production report"""
         logger.info("Starting production AWS analysis")
         
         report = {
             "timestamp": datetime.now().isoformat(),
-            "account_id": self.session.client('sts').get_caller_identity()['Account'],
+            "account_id": get_client('sts').get_caller_identity()['Account'],
             "region": self.session.region_name or "us-east-1",
             "analysis": {}
         }
@@ -241,6 +272,8 @@ if __name__ == "__main__":
     try:
         manager = ProductionAWSManager()
         report = manager.generate_report()
+        if METRICS_FILE:
+            registry.write(METRICS_FILE)
         print(f"✅ Production analysis complete. Check logs in {log_dir}")
     except Exception as e:
         logger.error(f"Production run failed: {e}")
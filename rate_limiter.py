@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+"""
+Adaptive AWS API Rate Limiter
+Per-service, per-region token buckets tuned with AIMD on throttling errors
+"""
+
+import threading
+import time
+
+from metrics import AWS_THROTTLES
+
+THROTTLE_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'TransactionInProgressException',
+    'SlowDown', 'BandwidthLimitExceeded', 'EC2ThrottledException', 'PriorRequestNotComplete'
+}
+# Codes that mean throttling only for some services; elsewhere LimitExceededException
+# is a quota error (too many resources) and slowing down would not help
+SERVICE_THROTTLE_ERROR_CODES = {
+    'apigateway': {'LimitExceededException'},
+}
+
+# Starting requests/second per service; everything else uses DEFAULT_RATE
+SERVICE_RATES = {
+    'ce': 5.0,
+    'iam': 10.0,
+    'sts': 10.0,
+    'organizations': 5.0,
+    'sso-admin': 5.0,
+}
+DEFAULT_RATE = 20.0
+
+
+class TokenBucket:
+    """Token bucket whose refill rate follows AIMD
+
+    Each success raises the rate by `increase / rate`, i.e. roughly
+    `increase` req/s per second of clean traffic. A throttle multiplies it by
+    `decrease`, at most once per `cooldown` seconds so a burst of concurrent
+    throttles only counts once.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.5, max_rate=None,
+                 increase=1.0, decrease=0.5, cooldown=1.0):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate or self.rate * 5
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.throttles = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Take one token, sleeping until it is available; returns the wait in seconds"""
+        with self._lock:
+            self._refill(time.monotonic())
+            # Reserve the token now so concurrent callers queue up fairly
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self):
+        """Additive increase"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        """Multiplicative decrease"""
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class AdaptiveRateLimiter:
+    """One TokenBucket per (service, region), created on first use"""
+
+    def __init__(self, service_rates=None, default_rate=DEFAULT_RATE):
+        self.service_rates = dict(SERVICE_RATES, **(service_rates or {}))
+        self.default_rate = default_rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, service, region):
+        key = (service, region)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.service_rates.get(service, self.default_rate))
+            return self._buckets[key]
+
+    def acquire(self, service, region):
+        return self.bucket(service, region).acquire()
+
+    def record_success(self, service, region):
+        self.bucket(service, region).on_success()
+
+    def record_throttle(self, service, region):
+        AWS_THROTTLES.inc(service=service, region=region or 'default')
+        self.bucket(service, region).on_throttle()
+
+    def install(self, client):
+        """Route every HTTP attempt of a boto3 client through the limiter
+
+        Tokens are taken in `before-send` so botocore's own retries are
+        limited too; throttling error codes seen in `needs-retry` trigger the
+        multiplicative decrease and successful calls the additive increase.
+        """
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+        events = client.meta.events
+
+        def before_send(**kwargs):
+            self.acquire(service, region)
+
+        def needs_retry(response=None, **kwargs):
+            if response and is_throttle_error(response[1], service):
+                self.record_throttle(service, region)
+
+        def after_call(http_response=None, **kwargs):
+            if http_response is not None and http_response.status_code < 300:
+                self.record_success(service, region)
+
+        events.register('before-send', before_send, unique_id='aws-mgmt-ratelimit-send')
+        events.register('needs-retry', needs_retry, unique_id='aws-mgmt-ratelimit-retry')
+        events.register('after-call', after_call, unique_id='aws-mgmt-ratelimit-call')
+        return client
+
+    def stats(self):
+        """Current rate and throttle count per (service, region)"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            f"{service}/{region or 'default'}": {'rate': round(b.rate, 2), 'throttles': b.throttles}
+            for (service, region), b in buckets.items()
+        }
+
+
+def is_throttle_error(parsed, service=None):
+    """True if a parsed botocore response carries a throttling error code for `service`"""
+    code = (parsed or {}).get('Error', {}).get('Code')
+    return code in THROTTLE_ERROR_CODES or code in SERVICE_THROTTLE_ERROR_CODES.get(service, ())
+
+
+_limiter = AdaptiveRateLimiter()
+
+
+def get_limiter():
+    """The process-wide AdaptiveRateLimiter"""
+    return _limiter
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+"""
+Persistent AWS Response Cache
+SQLite (WAL) cache shared by every tool, CLI run and Flask worker on the host
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+from metrics import CACHE_LOOKUPS
+
+CACHE_DIR = Path(os.environ.get('AWS_MGMT_CACHE_DIR', Path.home() / '.cache' / 'aws-mgmt'))
+DEFAULT_TTL = 300
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# Seconds each operation stays fresh; Cost Explorer data only moves a few times a day
+OPERATION_TTLS = {
+    'ce:get_cost_and_usage': 6 * 3600,
+    'ce:get_cost_forecast': 6 * 3600,
+    'ce:get_dimension_values': 24 * 3600,
+    'sts:get_caller_identity': 24 * 3600,
+    'ec2:describe_regions': 24 * 3600,
+    'iam:get_account_summary': 900,
+    'iam:list_users': 900,
+    'iam:list_roles': 900,
+    'iam:list_policies': 900,
+    'sso-admin:list_instances': 3600,
+}
+
+READ_PREFIXES = ('get_', 'describe_', 'list_')
+
+# Reads that return secrets or credentials never go to disk
+UNCACHED_SERVICES = {'secretsmanager', 'ssm', 'kms', 'sso', 'sso-oidc', 'cognito-identity', 'ecr'}
+UNCACHED_OPERATIONS = {'sts:get_session_token', 'sts:get_federation_token', 'iam:get_credential_report'}
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+class ResponseCache:
+    """Key/value cache with per-operation TTLs and size-bounded LRU eviction
+
+    Keys are (account, region, service:operation, normalized params).
+    Values are JSON with datetimes preserved. WAL mode lets many processes
+    read while one writes.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.path = Path(path) if path else CACHE_DIR / 'responses.db'
+        self.max_bytes = max_bytes
+        self.ttls = dict(OPERATION_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork (pre-forking servers) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                operation TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn().execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)')
+
+    @staticmethod
+    def make_key(account, region, operation, params=None):
+        normalized = json.dumps([account, region, operation, params or {}],
+                                sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def ttl_for(self, operation):
+        return self.ttls.get(operation, DEFAULT_TTL)
+
+    def get(self, key):
+        """Cached value, or None when missing, expired or bypassed with --refresh"""
+        if refresh_requested():
+            self._count(hit=False)
+            return None
+        now = time.time()
+        row = self._conn().execute('SELECT value, expires FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] < now:
+            self._count(hit=False)
+            return None
+        self._conn().execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+        self._count(hit=True)
+        return json.loads(row[0], object_hook=_decode)
+
+    def set(self, key, operation, value, ttl=None):
+        """Store a value; oversized entries are skipped"""
+        data = json.dumps(value, default=_encode, separators=(',', ':'))
+        if len(data) > MAX_ENTRY_BYTES:
+            return False
+        now = time.time()
+        ttl = self.ttl_for(operation) if ttl is None else ttl
+        self._conn().execute(
+            'INSERT OR REPLACE INTO responses (key, operation, value, size, expires, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (key, operation, data, len(data), now + ttl, now))
+        self._evict()
+        return True
+
+    def _evict(self):
+        """Drop expired rows, then least-recently-used rows until under max_bytes"""
+        conn = self._conn()
+        conn.execute('DELETE FROM responses WHERE expires < ?', (time.time(),))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+
+    def cached(self, key, operation, compute, ttl=None):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, operation, value, ttl)
+        return value
+
+    def clear(self):
+        self._conn().execute('DELETE FROM responses')
+
+    def _count(self, hit):
+        CACHE_LOOKUPS.inc(cache='responses', result='hit' if hit else 'miss')
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        entries, size = self._conn().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'size_bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def is_cacheable(operation):
+    """Only read-only operations that return no secrets are cached"""
+    service, _, method = operation.partition(':')
+    if service in UNCACHED_SERVICES or operation in UNCACHED_OPERATIONS:
+        return False
+    return method.startswith(READ_PREFIXES)
+
+
+_refresh = os.environ.get('AWS_MGMT_REFRESH') == '1'
+_refresh_local = threading.local()
+
+
+def refresh_requested():
+    return _refresh or getattr(_refresh_local, 'active', False)
+
+
+def set_refresh(flag=True):
+    """Bypass cached reads for the rest of the process (the --refresh flag)"""
+    global _refresh
+    _refresh = flag
+
+
+@contextmanager
+def refreshing():
+    """Bypass cached reads for calls made by this thread inside the block"""
+    previous = getattr(_refresh_local, 'active', False)
+    _refresh_local.active = True
+    try:
+        yield
+    finally:
+        _refresh_local.active = previous
+
+
+def consume_refresh_flag(argv):
+    """Strip --refresh from argv and turn on cache bypass if it was present"""
+    if '--refresh' in argv:
+        argv.remove('--refresh')
+        set_refresh(True)
+        return True
+    return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide ResponseCache, or None when caching is disabled or unavailable"""
+    global _cache
+    if os.environ.get('AWS_MGMT_CACHE') == '0':
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ResponseCache()
+            except (OSError, sqlite3.Error):
+                # Read-only home or broken database: run uncached
+                _cache = False
+        return _cache or None
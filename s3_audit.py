@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""
+S3 Public Exposure Audit
+Concurrent ACL, bucket policy and public access block checks across every bucket
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from aws_client import get_client
+from aws_resources import bucket_region, iter_s3_buckets
+
+PUBLIC_GRANTEES = {
+    'http://acs.amazonaws.com/groups/global/AllUsers': 'AllUsers',
+    'http://acs.amazonaws.com/groups/global/AuthenticatedUsers': 'AuthenticatedUsers'
+}
+PAB_FLAGS = ['BlockPublicAcls', 'IgnorePublicAcls', 'BlockPublicPolicy', 'RestrictPublicBuckets']
+
+# Error codes that mean "nothing configured" rather than a failed check
+NOT_CONFIGURED = {'NoSuchBucketPolicy', 'NoSuchPublicAccessBlockConfiguration'}
+
+DEFAULT_CONCURRENCY = int(os.environ.get('AWS_MGMT_CONCURRENCY', '16'))
+
+
+class S3ExposureAudit:
+    """Audit every bucket with bounded parallelism
+
+    Bucket regions are resolved first so each check uses a client in the
+    bucket's own region. The ACL, policy status and public access block
+    checks of all buckets then run concurrently. Findings are added as
+    each bucket completes and can be read with progress() while the audit
+    runs.
+    """
+
+    CHECKS = ('acl', 'policy_status', 'public_access_block')
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, profile=None):
+        self.concurrency = max(1, concurrency)
+        self.profile = profile
+        self.findings = []
+        self.errors = []
+        self.total = 0
+        self.completed = 0
+        self.done = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, buckets=None):
+        """Run the audit in a background thread; poll progress() for results"""
+        self._thread = threading.Thread(target=self.run, args=(buckets,), daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+        return self.progress()
+
+    def progress(self):
+        """Snapshot of the findings so far"""
+        with self._lock:
+            return {
+                'buckets_total': self.total,
+                'buckets_audited': self.completed,
+                'findings': list(self.findings),
+                'errors': list(self.errors),
+                'done': self.done
+            }
+
+    def run(self, buckets=None):
+        """Audit `buckets` (default: every bucket in the account) and return the results"""
+        buckets = list(buckets) if buckets is not None else list(iter_s3_buckets(profile=self.profile))
+        with self._lock:
+            self.total = len(buckets)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            regions = self._resolve_regions(executor, buckets)
+
+            futures = {
+                executor.submit(self._run_check, check, name, region): (name, check)
+                for name, region in regions.items()
+                for check in self.CHECKS
+            }
+            results = {name: {} for name in regions}
+            for future in as_completed(futures):
+                name, check = futures[future]
+                results[name][check] = future.result()
+                if len(results[name]) == len(self.CHECKS):
+                    self._complete_bucket(name, results.pop(name))
+
+        with self._lock:
+            self.done = True
+        return self.progress()
+
+    def _resolve_regions(self, executor, buckets):
+        """Map bucket name -> region, resolved concurrently where list_buckets did not say"""
+        regions = {}
+        futures = {}
+        for bucket in buckets:
+            name = bucket['Name'] if isinstance(bucket, dict) else bucket
+            if isinstance(bucket, dict) and bucket.get('BucketRegion'):
+                regions[name] = bucket['BucketRegion']
+            else:
+                futures[executor.submit(bucket_region, bucket, self.profile)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                regions[name] = future.result()
+            except Exception as e:
+                self._record_error(name, 'region', e)
+                self._mark_completed()
+        return regions
+
+    def _run_check(self, check, bucket, region):
+        """Returns ('ok', response), ('missing', None) or ('error', exception)"""
+        s3 = get_client('s3', region=region, profile=self.profile)
+        try:
+            if check == 'acl':
+                return 'ok', s3.get_bucket_acl(Bucket=bucket)
+            if check == 'policy_status':
+                return 'ok', s3.get_bucket_policy_status(Bucket=bucket)
+            return 'ok', s3.get_public_access_block(Bucket=bucket)
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in NOT_CONFIGURED:
+                return 'missing', None
+            return 'error', e
+
+    def _complete_bucket(self, bucket, results):
+        findings = []
+        for check, (status, response) in results.items():
+            if status == 'error':
+                self._record_error(bucket, check, response)
+            elif check == 'acl':
+                for grant in response.get('Grants', []):
+                    group = PUBLIC_GRANTEES.get(grant.get('Grantee', {}).get('URI'))
+                    if group:
+                        findings.append(self._finding('public_s3_bucket', bucket, 'HIGH',
+                                                      f"ACL grants {grant.get('Permission')} to {group}"))
+            elif check == 'policy_status':
+                if status == 'ok' and response.get('PolicyStatus', {}).get('IsPublic'):
+                    findings.append(self._finding('public_s3_bucket_policy', bucket, 'HIGH',
+                                                  'Bucket policy allows public access'))
+            elif check == 'public_access_block':
+                config = response.get('PublicAccessBlockConfiguration', {}) if status == 'ok' else {}
+                disabled = [flag for flag in PAB_FLAGS if not config.get(flag)]
+                if disabled:
+                    findings.append(self._finding('public_access_block_disabled', bucket, 'MEDIUM',
+                                                  f"Public access block off: {', '.join(disabled)}"))
+
+        with self._lock:
+            self.findings.extend(findings)
+        self._mark_completed()
+
+    def _finding(self, finding_type, bucket, severity, description):
+        return {'type': finding_type, 'resource': bucket, 'severity': severity, 'description': description}
+
+    def _record_error(self, bucket, check, error):
+        with self._lock:
+            self.errors.append({'resource': bucket, 'check': check, 'error': str(error)})
+
+    def _mark_completed(self):
+        with self._lock:
+            self.completed += 1
+
+
+def main():
+    import json
+    import sys
+
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONCURRENCY
+    result = S3ExposureAudit(concurrency).run()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
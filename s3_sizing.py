@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+"""
+S3 Bucket Sizing Backends
+Bucket sizes from CloudWatch storage metrics or S3 Inventory reports instead of object listing
+"""
+
+import csv
+import gzip
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from aws_client import AWSClientError
+from aws_resources import bucket_region, iter_pages
+
+# BucketSizeBytes is published per storage class; sum the ones S3 reports
+STORAGE_TYPES = [
+    'StandardStorage', 'IntelligentTieringFAStorage', 'IntelligentTieringIAStorage',
+    'IntelligentTieringAIAStorage', 'IntelligentTieringAAStorage', 'IntelligentTieringDAAStorage',
+    'StandardIAStorage', 'OneZoneIAStorage', 'ReducedRedundancyStorage',
+    'GlacierInstantRetrievalStorage', 'GlacierStorage', 'GlacierStagingStorage',
+    'DeepArchiveStorage', 'DeepArchiveStagingStorage'
+]
+MAX_QUERIES_PER_REQUEST = 500
+# Concurrent GetBucketLocation calls for buckets listed without BucketRegion
+REGION_LOOKUP_WORKERS = 16
+
+
+class CloudWatchSizer:
+    """Size buckets from the daily AWS/S3 storage metrics
+
+    All buckets of a region are sized with one paginated GetMetricData call
+    (split every 500 queries), so the cost does not depend on object count.
+    Metrics are daily, so sizes lag by up to a day and new buckets report 0.
+    """
+
+    source = 'cloudwatch'
+
+    def __init__(self, lookback_days=3, profile=None):
+        self.lookback_days = lookback_days
+        self.profile = profile
+
+    def size_buckets(self, buckets):
+        """Return {bucket name: {'size_bytes', 'object_count', 'source'}}"""
+        by_region = defaultdict(list)
+        sizes = {}
+        for name, region in self._regions(buckets):
+            if region is None:
+                sizes[name] = {'size_bytes': 0, 'object_count': 0, 'source': self.source,
+                               'error': 'access_denied'}
+            else:
+                by_region[region].append(name)
+
+        for region, names in by_region.items():
+            sizes.update(self._size_region(region, names))
+        return sizes
+
+    def _regions(self, buckets):
+        """(name, region or None) per bucket; ListBuckets' BucketRegion is used when present"""
+        def lookup(bucket):
+            name = bucket['Name'] if isinstance(bucket, dict) else bucket
+            try:
+                return name, bucket_region(bucket, profile=self.profile)
+            except AWSClientError:
+                return name, None
+
+        buckets = list(buckets)
+        known = [b for b in buckets if isinstance(b, dict) and b.get('BucketRegion')]
+        unknown = [b for b in buckets if not (isinstance(b, dict) and b.get('BucketRegion'))]
+        regions = [lookup(b) for b in known]
+        if unknown:
+            with ThreadPoolExecutor(max_workers=min(REGION_LOOKUP_WORKERS, len(unknown))) as executor:
+                regions.extend(executor.map(lookup, unknown))
+        return regions
+
+    def _size_region(self, region, names):
+        queries = []
+        targets = {}
+        for i, name in enumerate(names):
+            for j, storage_type in enumerate(STORAGE_TYPES):
+                query_id = f"s{i}_{j}"
+                queries.append(self._query(query_id, name, 'BucketSizeBytes', storage_type))
+                targets[query_id] = (name, 'size_bytes')
+            query_id = f"n{i}"
+            queries.append(self._query(query_id, name, 'NumberOfObjects', 'AllStorageTypes'))
+            targets[query_id] = (name, 'object_count')
+
+        # Newest (timestamp, value) per query; a query's datapoints can span pages
+        latest = {}
+        end = datetime.now(timezone.utc)
+        start = end - timedelta(days=self.lookback_days)
+
+        for offset in range(0, len(queries), MAX_QUERIES_PER_REQUEST):
+            batch = queries[offset:offset + MAX_QUERIES_PER_REQUEST]
+            for page in iter_pages('cloudwatch', 'get_metric_data', region=region, profile=self.profile,
+                                   MetricDataQueries=batch, StartTime=start, EndTime=end,
+                                   ScanBy='TimestampDescending'):
+                for result in page.get('MetricDataResults', []):
+                    if result.get('Values'):
+                        # Newest datapoint first within a page
+                        point = (result['Timestamps'][0], result['Values'][0])
+                        if result['Id'] not in latest or point[0] > latest[result['Id']][0]:
+                            latest[result['Id']] = point
+
+        sizes = {name: {'size_bytes': 0, 'object_count': 0, 'source': self.source} for name in names}
+        for query_id, (_, value) in latest.items():
+            name, field = targets[query_id]
+            sizes[name][field] += int(value)
+        return sizes
+
+    def _query(self, query_id, bucket, metric, storage_type):
+        return {
+            'Id': query_id,
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': 'AWS/S3',
+                    'MetricName': metric,
+                    'Dimensions': [
+                        {'Name': 'BucketName', 'Value': bucket},
+                        {'Name': 'StorageType', 'Value': storage_type}
+                    ]
+                },
+                'Period': 86400,
+                'Stat': 'Average'
+            },
+            'ReturnData': True
+        }
+
+
+class InventorySizer:
+    """Size buckets from S3 Inventory reports synced to a local directory
+
+    `inventory_dir` mirrors the inventory destination bucket, i.e.
+    <source-bucket>/<config-id>/<timestamp>/manifest.json plus the data
+    files the manifests list. The newest manifest per bucket is streamed
+    row by row; CSV is read natively and Parquet needs pyarrow.
+    """
+
+    source = 'inventory'
+
+    def __init__(self, inventory_dir):
+        self.inventory_dir = Path(inventory_dir)
+
+    def latest_manifests(self):
+        """Map source bucket -> newest manifest.json path"""
+        latest = {}
+        for manifest in self.inventory_dir.glob('*/*/*/manifest.json'):
+            bucket = manifest.parts[-4]
+            # Timestamp folders (2024-01-01T01-00Z) sort chronologically
+            if bucket not in latest or manifest.parent.name > latest[bucket].parent.name:
+                latest[bucket] = manifest
+        return latest
+
+    def size_buckets(self, buckets):
+        """Return {bucket name: {'size_bytes', 'object_count', 'source'}} for buckets with a report"""
+        manifests = self.latest_manifests()
+        sizes = {}
+        for bucket in buckets:
+            name = bucket['Name'] if isinstance(bucket, dict) else bucket
+            if name in manifests:
+                sizes[name] = self.size_from_manifest(manifests[name])
+        return sizes
+
+    def size_from_manifest(self, manifest_path):
+        manifest = json.loads(Path(manifest_path).read_text())
+        file_format = manifest.get('fileFormat', 'CSV').upper()
+        size_bytes = 0
+        object_count = 0
+
+        for data_file in manifest.get('files', []):
+            path = self._data_path(Path(manifest_path), data_file['key'])
+            if file_format == 'CSV':
+                sizes = self._csv_sizes(path, manifest.get('fileSchema', ''))
+            elif file_format == 'PARQUET':
+                sizes = self._parquet_sizes(path)
+            else:
+                raise ValueError(f"Unsupported inventory format: {file_format}")
+            for size in sizes:
+                size_bytes += size
+                object_count += 1
+
+        return {
+            'size_bytes': size_bytes,
+            'object_count': object_count,
+            'source': self.source,
+            'report_date': manifest_path.parent.name
+        }
+
+    def _data_path(self, manifest_path, key):
+        path = self.inventory_dir / key
+        if path.exists():
+            return path
+        # Keys include the destination prefix; fall back to the config's data/ folder
+        return manifest_path.parent.parent / 'data' / Path(key).name
+
+    def _csv_sizes(self, path, file_schema):
+        columns = [c.strip().lower() for c in file_schema.split(',')]
+        size_idx = columns.index('size')
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'rt', newline='') as f:
+            for row in csv.reader(f):
+                # Delete markers have an empty size
+                yield int(row[size_idx]) if len(row) > size_idx and row[size_idx] else 0
+
+    def _parquet_sizes(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Parquet inventory needs pyarrow: pip install pyarrow") from e
+        parquet = pq.ParquetFile(path)
+        size_column = next(name for name in parquet.schema_arrow.names if name.lower() == 'size')
+        for batch in parquet.iter_batches(columns=[size_column]):
+            for size in batch.column(0).to_pylist():
+                yield size or 0
+
+
+def size_buckets(buckets, backend=None, inventory_dir=None, profile=None):
+    """Size buckets with the configured backend
+
+    `backend` defaults to $AWS_MGMT_S3_SIZING ('cloudwatch' or 'inventory').
+    With the inventory backend, buckets that have no report fall back to
+    CloudWatch.
+    """
+    buckets = list(buckets)
+    backend = backend or os.environ.get('AWS_MGMT_S3_SIZING', 'cloudwatch')
+    inventory_dir = inventory_dir or os.environ.get('AWS_MGMT_S3_INVENTORY_DIR')
+
+    sizes = {}
+    if backend == 'inventory':
+        if not inventory_dir:
+            raise ValueError("Inventory sizing needs AWS_MGMT_S3_INVENTORY_DIR")
+        sizes = InventorySizer(inventory_dir).size_buckets(buckets)
+    elif backend != 'cloudwatch':
+        raise ValueError(f"Unknown S3 sizing backend: {backend}")
+
+    remaining = [b for b in buckets if (b['Name'] if isinstance(b, dict) else b) not in sizes]
+    if remaining:
+        sizes.update(CloudWatchSizer(profile=profile).size_buckets(remaining))
+    return sizes
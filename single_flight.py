@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+"""
+Single-Flight Request Coalescing
+Concurrent identical calls share one computation, with a short result cache in front
+"""
+
+import threading
+import time
+
+from metrics import CACHE_LOOKUPS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time
+
+    The first caller for a key computes; callers arriving while it runs
+    wait and receive the same result (or exception). Successful results
+    (those passing `cacheable`, if given) are then served for `ttl`
+    seconds without recomputing. A `name` reports lookups as cache metrics.
+    """
+
+    def __init__(self, ttl=0, cacheable=None, name=None):
+        self.ttl = ttl
+        self.cacheable = cacheable
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}
+        self.computed = 0
+        self.shared = 0
+        self.cached = 0
+
+    def do(self, key, fn, *args, fresh=False, **kwargs):
+        """Result of fn(*args, **kwargs) for key; `fresh` skips the result cache"""
+        with self._lock:
+            if not fresh and key in self._results:
+                value, stamp = self._results[key]
+                if time.time() - stamp < self.ttl:
+                    self.cached += 1
+                    self._record('hit')
+                    return value
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        self._record('miss' if leader else 'shared')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.computed += 1
+                if call.error is None and self.ttl > 0 and (self.cacheable is None or self.cacheable(call.result)):
+                    now = time.time()
+                    for expired in [k for k, (_, stamp) in self._results.items() if now - stamp >= self.ttl]:
+                        del self._results[expired]
+                    self._results[key] = (call.result, now)
+            call.done.set()
+        return call.result
+
+    def peek(self, key):
+        """key's cached result if still fresh, else None (counted as a lookup)"""
+        with self._lock:
+            entry = self._results.get(key)
+            fresh = entry is not None and time.time() - entry[1] < self.ttl
+            if fresh:
+                self.cached += 1
+        self._record('hit' if fresh else 'miss')
+        return entry[0] if fresh else None
+
+    def put(self, key, value):
+        """Cache a result computed outside do() (subject to `cacheable`)"""
+        if self.ttl > 0 and (self.cacheable is None or self.cacheable(value)):
+            with self._lock:
+                self._results[key] = (value, time.time())
+
+    def _record(self, result):
+        if self.name:
+            CACHE_LOOKUPS.inc(cache=self.name, result=result)
+
+    def age(self, key):
+        """Seconds since key's cached result was computed, or None"""
+        with self._lock:
+            entry = self._results.get(key)
+        return time.time() - entry[1] if entry else None
+
+    def forget(self, key=None):
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'computed': self.computed,
+                'shared': self.shared,
+                'cached': self.cached,
+                'in_flight': len(self._calls)
+            }
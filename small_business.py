@@ -5,10 +5,11 @@ Small Business AWS Cost Manager
 Simple, practical tools for small teams and startups
 """
 
-import json
-import subprocess
 from datetime import datetime
 
+from cost_ledger import get_ledger
+from response_cache import consume_refresh_flag
+
 class SmallBusinessManager:
     def __init__(self, monthly_budget=100):
         self.budget = monthly_budget
@@ -17,18 +18,7 @@ class SmallBusinessManager:
     def get_simple_cost_overview(self):
         """Simple cost overview for small business"""
         try:
-            result = subprocess.run([
-                'aws', 'ce', 'get-cost-and-usage',
-                '--time-period', f'Start={self._get_date(-30)},End={self._get_date(0)}',
-                '--granularity', 'MONTHLY', '--metrics', 'BlendedCost'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                current_spend = float(data.get('ResultsByTime', [{}])[0]
-                                    .get('Total', {}).get('BlendedCost', {}).get('Amount', '0'))
-            else:
-                current_spend = 0
+            current_spend = get_ledger().total(days=30)
         except:
             current_spend = 0
         
@@ -176,6 +166,7 @@ Per Team Member: ${cost_overview['per_team_member']:.2f}
 def main():
     import sys
     
+    consume_refresh_flag(sys.argv)
     if len(sys.argv) < 2:
         print("Usage: python3 small_business.py {overview|recommendations|architecture|report|emergency} [budget]")
         return
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+"""
+Stale-While-Revalidate Snapshots
+Background refresher that keeps the last good result of slow computations ready to serve
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import content_hash
+from response_cache import refreshing
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = float(os.environ.get('AWS_MGMT_SNAPSHOT_INTERVAL', '60'))
+# How long a request waits for the very first snapshot before answering "pending"
+COLD_WAIT = float(os.environ.get('AWS_MGMT_SNAPSHOT_COLD_WAIT', '10'))
+
+
+class Snapshot:
+    """One computed value with its timestamp and the last refresh error"""
+
+    def __init__(self, value=None, computed_at=None):
+        self.value = value
+        self.computed_at = computed_at
+        self.error = None
+        self.error_at = None
+        self._etag = None
+
+    @property
+    def ready(self):
+        return self.computed_at is not None
+
+    def age(self, now=None):
+        return (now or time.time()) - self.computed_at if self.ready else None
+
+    @property
+    def etag(self):
+        """Content hash of the value, computed once; snapshots are never mutated"""
+        if self._etag is None and self.ready:
+            self._etag = content_hash(self.value)
+        return self._etag
+
+    def with_error(self, error, error_at=None):
+        """A copy of this snapshot carrying a refresh error (the original stays untouched)"""
+        failed = Snapshot(self.value, self.computed_at)
+        failed.error, failed.error_at = error, error_at or time.time()
+        failed._etag = self._etag
+        return failed
+
+    @property
+    def failed(self):
+        """True if the last refresh failed after this value was computed"""
+        return self.error_at is not None and (self.computed_at is None or self.error_at > self.computed_at)
+
+    def max_age(self, interval):
+        """Seconds until the snapshot goes stale"""
+        return max(0, interval - self.age()) if self.ready else 0
+
+    def meta(self, interval):
+        age = self.age()
+        return {
+            'computed_at': self.computed_at,
+            'age_seconds': round(age, 3) if age is not None else None,
+            'stale': age is None or age >= interval,
+            'last_error': self.error
+        }
+
+
+class SnapshotRefresher:
+    """Serve the last good snapshot immediately and refresh in the background
+
+    Each registered computation is recomputed every `interval` seconds by
+    a daemon thread, and also on demand when a reader finds it stale.
+    Refreshes for the same name are coalesced with SingleFlight; a failed
+    refresh keeps the previous value and records the error.
+
+    With a `store` (the shared ResponseCache), snapshots are published to
+    it, and each process adopts a newer snapshot from the store instead of
+    recomputing, so several server workers share one refresh per interval.
+    Store keys include `account()`, so workers running with other
+    credentials never adopt each other's snapshots.
+
+    Functions passed to subscribe() are called with (name, snapshot)
+    whenever a snapshot's content changes, from whichever thread installed it.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, workers=4, store=None, account=None):
+        self.interval = interval
+        self.store = store
+        self.account = account or (lambda: None)
+        self._computations = {}
+        self._snapshots = {}
+        self._ready = {}
+        self._pending = set()
+        self._listeners = []
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snapshot')
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, name, compute, interval=None):
+        with self._lock:
+            self._computations[name] = (compute, interval or self.interval)
+            self._snapshots[name] = Snapshot()
+            self._ready[name] = threading.Event()
+
+    def subscribe(self, listener):
+        """Call listener(name, snapshot) for every new snapshot whose content differs from the last"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _install(self, name, snapshot):
+        """Make snapshot current and notify listeners if its content changed"""
+        # Snapshots are replaced, never mutated, so readers need no lock
+        with self._lock:
+            previous = self._snapshots[name]
+            self._snapshots[name] = snapshot
+            listeners = list(self._listeners)
+        self._ready[name].set()
+        if listeners and previous.etag != snapshot.etag:
+            for listener in listeners:
+                try:
+                    listener(name, snapshot)
+                except Exception as e:
+                    logger.warning(f"Snapshot {name} listener failed: {e}")
+
+    def start(self):
+        """Start the background loop (idempotent) and prime every snapshot"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='snapshot-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.time()
+            for name, (_, interval) in list(self._computations.items()):
+                snapshot = self._snapshots[name]
+                if not snapshot.ready or snapshot.age(now) >= interval:
+                    self.trigger(name)
+            self._stop.wait(min([i for _, i in self._computations.values()] or [self.interval]) / 4)
+
+    def trigger(self, name):
+        """Start a background refresh unless one is already queued or running"""
+        with self._lock:
+            if name in self._pending:
+                return
+            self._pending.add(name)
+
+        def run():
+            try:
+                self.refresh(name, adopt_shared=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(name)
+
+        self._executor.submit(run)
+
+    def refresh(self, name, bypass_cache=False, adopt_shared=False):
+        """Recompute now (joining a refresh already in flight) and return the snapshot
+
+        With `adopt_shared`, a snapshot another process published within the
+        interval is taken over instead of recomputing.
+        """
+        compute, interval = self._computations[name]
+        if adopt_shared and not bypass_cache:
+            shared = self._adopt_shared(name)
+            if shared.ready and shared.age() < interval:
+                return shared
+
+        def run():
+            if bypass_cache:
+                with refreshing():
+                    return compute()
+            return compute()
+
+        key = f'{name}:refresh' if bypass_cache else name
+        try:
+            value = self._flight.do(key, run)
+        except Exception as e:
+            logger.warning(f"Snapshot {name} refresh failed: {e}")
+            with self._lock:
+                failed = self._snapshots[name].with_error(str(e))
+                self._snapshots[name] = failed
+            # Release cold readers; they get the error instead of waiting out COLD_WAIT
+            self._ready[name].set()
+            return failed
+
+        fresh = Snapshot(value, time.time())
+        self._install(name, fresh)
+        self._publish(name, fresh, interval)
+        return fresh
+
+    def _store_key(self, name):
+        return self.store.make_key(self.account(), None, 'snapshot', name)
+
+    def _publish(self, name, snapshot, interval):
+        if self.store is None:
+            return
+        try:
+            self.store.set(self._store_key(name), f'snapshot:{name}',
+                           {'value': snapshot.value, 'computed_at': snapshot.computed_at},
+                           ttl=max(3600, interval * 10))
+        except Exception as e:
+            logger.warning(f"Snapshot {name} not shared: {e}")
+
+    def _adopt_shared(self, name):
+        """Take over the store's snapshot if it is newer than ours; returns the current snapshot"""
+        current = self._snapshots[name]
+        if self.store is None:
+            return current
+        try:
+            shared = self.store.get(self._store_key(name))
+        except Exception:
+            shared = None
+        if shared and (not current.ready or shared['computed_at'] > current.computed_at):
+            current = Snapshot(shared['value'], shared['computed_at'])
+            self._install(name, current)
+        return current
+
+    def get(self, name, cold_wait=COLD_WAIT):
+        """The latest snapshot; stale ones are served as-is and refreshed behind the scenes"""
+        self.start()
+        snapshot = self._snapshots[name]
+        interval = self._computations[name][1]
+        if not snapshot.ready or snapshot.age() >= interval:
+            snapshot = self._adopt_shared(name)
+        if not snapshot.ready:
+            self.trigger(name)
+            self._ready[name].wait(cold_wait)
+            snapshot = self._snapshots[name]
+        elif snapshot.age() >= interval:
+            self.trigger(name)
+        return snapshot
+
+    def status(self):
+        return {name: self._snapshots[name].meta(interval)
+                for name, (_, interval) in self._computations.items()}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# @file test/test_live_updates.py
+# @brief merge_patch/apply_patch round trips and UpdateHub delta frames
+# @description Run with: python -m pytest test
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from live_updates import HubFullError, UpdateHub, apply_patch, merge_patch
+
+
+class _Snapshot:
+    def __init__(self, etag, value):
+        self.etag = etag
+        self.value = value
+        self.computed_at = 0
+
+
+@pytest.mark.parametrize('old, new', [
+    ({}, {'a': 1}),
+    ({'a': 1, 'b': 2}, {'a': 1}),
+    ({'a': {'x': 1, 'y': 2}}, {'a': {'x': 3, 'y': 2}}),
+    ({'a': [1, 2]}, {'a': [2]}),
+    ({'a': {'x': 1}}, {'a': 5}),
+    ({'a': 5}, {'a': {'x': 1}}),
+])
+def test_merge_patch_round_trips(old, new):
+    assert apply_patch(old, merge_patch(old, new)) == new
+
+
+def test_none_value_is_dropped_on_the_client():
+    # null means "remove", so a key set to None cannot survive a patch
+    old, new = {'a': 1, 'b': 2}, {'a': None, 'b': 2}
+    patch = merge_patch(old, new)
+    assert patch == {'a': None}
+    assert apply_patch(old, patch) == {'b': 2}
+
+
+def _events(hub):
+    frames = hub.stream()
+    next(frames)  # retry:
+    return frames
+
+
+def _parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+def test_hub_sends_delta_when_patch_round_trips():
+    hub = UpdateHub(heartbeat=0.01)
+    hub.publish('costs', _Snapshot('v1', {'a': 1, 'b': 2}))
+    frames = _events(hub)
+    assert _parse(next(frames))[0] == 'snapshot'
+    hub.publish('costs', _Snapshot('v2', {'a': 3, 'b': 2}))
+    event, data = _parse(next(frames))
+    assert event == 'delta'
+    assert data['base'] == 'v1' and data['patch'] == {'a': 3}
+    frames.close()
+
+
+def test_hub_sends_full_snapshot_when_a_value_becomes_none():
+    hub = UpdateHub(heartbeat=0.01)
+    hub.publish('costs', _Snapshot('v1', {'a': 1}))
+    frames = _events(hub)
+    next(frames)
+    hub.publish('costs', _Snapshot('v2', {'a': None}))
+    event, data = _parse(next(frames))
+    assert event == 'snapshot'
+    assert data['value'] == {'a': None}
+    frames.close()
+
+
+def test_stream_ends_after_max_seconds():
+    hub = UpdateHub(heartbeat=0.01, max_seconds=0.05)
+    frames = list(hub.stream())
+    assert frames[0].startswith('retry:')
+    assert hub.stats()['subscribers'] == 0
+
+
+def test_stream_refused_when_full():
+    hub = UpdateHub(max_subscribers=1)
+    frames = _events(hub)
+    with pytest.raises(HubFullError):
+        hub.stream()
+    frames.close()
+    assert hub.stats()['subscribers'] == 0
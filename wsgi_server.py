@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""
+Production WSGI Serving
+Runs a Flask app under gunicorn with the settings in gunicorn.conf.py
+"""
+
+import importlib
+import runpy
+from pathlib import Path
+
+CONFIG = str(Path(__file__).parent / 'gunicorn.conf.py')
+
+
+def serve(app_uri, config=CONFIG):
+    """Serve the app named by `app_uri` ('module:attribute') with threaded gunicorn workers
+
+    The master only reads the config; each worker imports the app module
+    itself, so its background threads and SQLite connections are created
+    after the fork.
+
+    Workers share cached AWS responses, snapshots, job records and script
+    results through the SQLite stores, so any worker can answer any
+    request. SIGHUP reloads workers gracefully; SIGTERM drains and exits.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn is required for serve mode: pip install gunicorn")
+
+    class Application(BaseApplication):
+        def load_config(self):
+            # Set directly rather than via gunicorn's CLI parsing, which would read our argv
+            for key, value in runpy.run_path(config).items():
+                if key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            module, _, attribute = app_uri.partition(':')
+            return getattr(importlib.import_module(module), attribute or 'app')
+
+    Application().run()
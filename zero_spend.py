@@ -5,11 +5,13 @@ Zero Spend Strategy - Cost-optimized resource utilization
 Budget-based load balancing and availability management
 """
 
-import json
-import subprocess
 import time
 from datetime import datetime, timedelta
 
+from aws_client import aws_call
+from cost_ledger import get_ledger
+from response_cache import consume_refresh_flag
+
 class ZeroSpendManager:
     def __init__(self, budget=0):
         self.budget = float(budget)
@@ -19,16 +21,7 @@ class ZeroSpendManager:
     def analyze_spend(self):
         """Get current AWS spend"""
         try:
-            result = subprocess.run([
-                'aws', 'ce', 'get-cost-and-usage',
-                '--time-period', f'Start={self._get_date(-30)},End={self._get_date(0)}',
-                '--granularity', 'MONTHLY', '--metrics', 'BlendedCost'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                self.current_spend = float(data.get('ResultsByTime', [{}])[0]
-                                         .get('Total', {}).get('BlendedCost', {}).get('Amount', '0'))
+            self.current_spend = get_ledger().total(days=30)
         except:
             self.current_spend = 0
         
@@ -73,32 +66,26 @@ class ZeroSpendManager:
         
         # Stop non-essential instances
         try:
-            result = subprocess.run([
-                'aws', 'ec2', 'describe-instances',
-                '--query', 'Reservations[].Instances[?State.Name==`running`].[InstanceId,InstanceType,Tags[?Key==`Environment`].Value|[0]]',
-                '--output', 'json'
-            ], capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                instances = json.loads(result.stdout)
-                for instance in instances:
-                    instance_id, instance_type, env = instance[0], instance[1], instance[2] or 'unknown'
-                    
-                    if instance_type not in ['t2.micro', 't3.micro']:
-                        recommendations.append({
-                            'action': 'STOP_INSTANCE',
-                            'resource': instance_id,
-                            'reason': f'Non-free tier instance: {instance_type}',
-                            'savings': self._estimate_instance_cost(instance_type)
-                        })
-                    
-                    if env.lower() in ['dev', 'test', 'staging']:
-                        recommendations.append({
-                            'action': 'SCHEDULE_STOP',
-                            'resource': instance_id,
-                            'reason': 'Non-production environment',
-                            'schedule': 'Stop 6PM-8AM, weekends'
-                        })
+            instances = aws_call('ec2', 'describe-instances',
+                                 query='Reservations[].Instances[?State.Name==`running`].[InstanceId,InstanceType,Tags[?Key==`Environment`].Value|[0]]')
+            for instance in instances or []:
+                instance_id, instance_type, env = instance[0], instance[1], instance[2] or 'unknown'
+                
+                if instance_type not in ['t2.micro', 't3.micro']:
+                    recommendations.append({
+                        'action': 'STOP_INSTANCE',
+                        'resource': instance_id,
+                        'reason': f'Non-free tier instance: {instance_type}',
+                        'savings': self._estimate_instance_cost(instance_type)
+                    })
+                
+                if env.lower() in ['dev', 'test', 'staging']:
+                    recommendations.append({
+                        'action': 'SCHEDULE_STOP',
+                        'resource': instance_id,
+                        'reason': 'Non-production environment',
+                        'schedule': 'Stop 6PM-8AM, weekends'
+                    })
         except:
             pass
         
@@ -197,6 +184,7 @@ class ZeroSpendManager:
 def main():
     import sys
     
+    consume_refresh_flag(sys.argv)
     if len(sys.argv) < 2:
         print("Usage: python3 zero_spend.py {analyze|optimize|balance|emergency|architecture} [budget]")
         return